@@ -8,11 +8,13 @@ Version: 4.0
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import sys
 import os
+import re
 
 # Add src to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -21,7 +23,6 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from src.utils.data_processor import SafetyDataProcessor as DataProcessor
 from src.components.advanced_features import AdvancedFeatures
 from src.components.theme_manager import ThemeManager
-from src.components.gemini_chatbot import create_chatbot_interface
 
 # Page configuration
 st.set_page_config(
@@ -31,11 +32,212 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+MAIN_PAGE_TITLE = "الرئيسية المتقدمة"
+
+# Column name keywords identifying the role a column plays in a dataset
+COLUMN_ROLE_KEYWORDS = {
+    'sector': frozenset({'قطاع', 'sector'}),
+    'status': frozenset({'حالة', 'status'}),
+    'date': frozenset({'تاريخ', 'date'}),
+    'recommendation': frozenset({'توصي', 'recommendation'})
+}
+
+# One alternation with a named group per role, so each column name is scanned once
+COLUMN_ROLE_PATTERN = re.compile('|'.join(
+    f"(?P<{role}>{'|'.join(re.escape(keyword) for keyword in sorted(keywords))})"
+    for role, keywords in COLUMN_ROLE_KEYWORDS.items()
+))
+
+@st.cache_resource
+def get_data_processor():
+    """Create the data processor shared by all sessions"""
+    return DataProcessor()
+
+def get_data_signature():
+    """Fingerprint the database files and the processor so cached data is reloaded when they change"""
+    database_dir = get_data_processor().database_dir
+    processor_file = sys.modules[DataProcessor.__module__].__file__
+    processor_stat = os.stat(processor_file)
+    return ((os.path.basename(processor_file), processor_stat.st_mtime, processor_stat.st_size),) + tuple(
+        (entry.name, entry.stat().st_mtime, entry.stat().st_size)
+        for entry in sorted(os.scandir(database_dir), key=lambda entry: entry.name)
+        if entry.is_file()
+    )
+
+@st.cache_data(show_spinner="جاري تحميل ومعالجة البيانات...", persist="disk")
+def load_dashboard_data(data_signature):
+    """Load all data sources and build the KPI and quality reports"""
+    processor = get_data_processor()
+    
+    # Load all data from database directory
+    all_data = processor.load_all_data()
+    
+    # Flatten the data structure for easier access
+    unified_data = {}
+    for source_name, source_data in all_data.items():
+        if isinstance(source_data, dict):
+            # Excel file with multiple sheets
+            for sheet_name, sheet_data in source_data.items():
+                unified_data[f"{source_name}_{sheet_name}"] = sheet_data
+        else:
+            # CSV file
+            unified_data[source_name.replace('.csv', '')] = source_data
+    
+    # Generate KPIs
+    kpi_data = processor.generate_kpis(unified_data)
+    
+    # Generate quality report (one QualityEntry per dataset, display strings included)
+    quality_report = processor.generate_quality_report(unified_data)
+    
+    return unified_data, kpi_data, quality_report
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_dashboard_bundle(data_signature):
+    """Share one loaded copy of the dashboard data across sessions and reruns"""
+    return get_data_processor(), *load_dashboard_data(data_signature)
+
+@st.cache_data(show_spinner=False)
+def build_data_types_table(column_names, column_types):
+    """Build the column/type table shown in the quality report"""
+    return pd.DataFrame({'العمود': list(column_names), 'النوع': list(column_types)})
+
+@st.cache_data(show_spinner=False, ttl=60)
+def get_update_timestamp():
+    """Format the current time, reused for a minute"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
+
+@st.cache_data(show_spinner=False)
+def dataframe_to_csv(df):
+    """Encode a dataframe as UTF-8 CSV for download"""
+    return df.to_csv(index=False).encode('utf-8-sig')
+
+def first_column(df, col):
+    """Return a column as a series, taking the first one if the name is duplicated"""
+    values = df[col]
+    return values.iloc[:, 0] if isinstance(values, pd.DataFrame) else values
+
+@st.cache_data(show_spinner=False)
+def classify_columns(column_signature):
+    """Map the columns of each dataset to their roles in a single scan"""
+    column_roles = {}
+    for dataset_name, columns in column_signature:
+        roles = {role: [] for role in COLUMN_ROLE_KEYWORDS}
+        for col in columns:
+            matched_roles = {match.lastgroup for match in COLUMN_ROLE_PATTERN.finditer(str(col).lower())}
+            for role in roles:
+                if role in matched_roles:
+                    roles[role].append(col)
+        column_roles[dataset_name] = roles
+    
+    return column_roles
+
+def get_column_roles(unified_data):
+    """Look up the cached column roles for the given datasets"""
+    return classify_columns(tuple((dataset_name, tuple(df.columns)) for dataset_name, df in unified_data.items()))
+
+@st.cache_data(show_spinner=False)
+def get_filter_options(data_signature, _unified_data):
+    """Collect the sector filter options once per data load"""
+    column_roles = get_column_roles(_unified_data)
+    available_sectors = set()
+    for dataset_name, df in _unified_data.items():
+        if not df.empty:
+            for col in column_roles[dataset_name]['sector']:
+                col_data = first_column(df, col)
+                # Categorical columns already hold their distinct values
+                if isinstance(col_data.dtype, pd.CategoricalDtype):
+                    available_sectors.update(col_data.cat.categories)
+                else:
+                    available_sectors.update(col_data.dropna().unique())
+    
+    return {'sectors': sorted(available_sectors)}
+
 # Initialize components
-data_processor = DataProcessor()
+data_processor = get_data_processor()
 advanced_features = AdvancedFeatures()
 theme_manager = ThemeManager()
 
+@st.cache_data(show_spinner=False)
+def build_sector_index(inspection_data, sectors):
+    """Map each sector to the row positions of its records"""
+    sector_values = inspection_data['القطاع'].astype(str)
+    return {
+        sector: np.flatnonzero(sector_values.str.contains(sector, na=False).to_numpy())
+        for sector in sectors
+    }
+
+@st.cache_data(show_spinner=False)
+def calculate_sector_compliance(inspection_data, sectors):
+    """Calculate closing compliance for each sector in a single pass"""
+    sector_index = build_sector_index(inspection_data, sectors)
+    closed = inspection_data['الحالة'].astype(str).str.contains('مغلق|مكتمل', na=False).to_numpy()
+    
+    total_records = np.array([len(sector_index[sector]) for sector in sectors], dtype=np.int64)
+    closed_records = np.array([closed[sector_index[sector]].sum() for sector in sectors], dtype=np.int64)
+    compliance_percentage = np.divide(
+        closed_records * 100.0, total_records,
+        out=np.zeros(len(sectors)), where=total_records > 0
+    )
+    
+    compliance_df = pd.DataFrame({
+        'القطاع': list(sectors),
+        'إجمالي السجلات': total_records,
+        'السجلات المغلقة': closed_records,
+        'السجلات المفتوحة': total_records - closed_records,
+        'نسبة الامتثال %': compliance_percentage,
+        'الحالة': (
+            pd.Series(np.select([compliance_percentage >= 90, compliance_percentage >= 70], ['🟢', '🟡'], default='🔴'))
+            + ' ' + np.where(compliance_percentage >= 50, 'مغلق', 'مفتوح')
+        ),
+        'التوصية': np.select(
+            [compliance_percentage >= 90, compliance_percentage >= 70],
+            ['ممتاز - استمر في الأداء الجيد', 'جيد - يحتاج تحسين طفيف'],
+            default='يحتاج تحسين عاجل'
+        )
+    })
+    
+    return compliance_df[compliance_df['إجمالي السجلات'] > 0].reset_index(drop=True)
+
+@st.cache_data(show_spinner=False)
+def calculate_activity_risk(risk_assessment_data, activities):
+    """Summarize assessments and high-risk share for each risk activity"""
+    text_data = risk_assessment_data.astype(str)
+    high_risk_rows = text_data.apply(lambda x: x.str.contains('عالي|مرتفع', na=False)).any(axis=1)
+    
+    risk_data = []
+    for activity in activities:
+        # Rows mentioning this activity in any column
+        activity_rows = text_data.apply(lambda x: x.str.contains(activity, na=False)).any(axis=1)
+        total_assessments = int(activity_rows.sum())
+        
+        if total_assessments > 0:
+            high_risk = int((activity_rows & high_risk_rows).sum())
+            
+            # Generate risk level
+            risk_percentage = high_risk / total_assessments * 100
+            
+            if risk_percentage >= 70:
+                risk_level = "🔴 عالي"
+                priority = 1
+            elif risk_percentage >= 40:
+                risk_level = "🟡 متوسط"
+                priority = 2
+            else:
+                risk_level = "🟢 منخفض"
+                priority = 3
+            
+            risk_data.append({
+                'النشاط': activity,
+                'إجمالي التقييمات': total_assessments,
+                'المخاطر العالية': high_risk,
+                'مستوى المخاطر': risk_level,
+                'نسبة المخاطر %': f"{risk_percentage:.1f}%",
+                'الأولوية': priority,
+                'التوصية': 'مراجعة عاجلة' if risk_percentage >= 70 else 'مراقبة دورية'
+            })
+    
+    return pd.DataFrame(risk_data)
+
 class UltimateDashboard:
     def __init__(self):
         self.data_processor = data_processor
@@ -43,18 +245,10 @@ class UltimateDashboard:
         self.theme_manager = theme_manager
         
         # Initialize session state
-        if 'data_loaded' not in st.session_state:
-            st.session_state.data_loaded = False
-        if 'unified_data' not in st.session_state:
-            st.session_state.unified_data = {}
-        if 'kpi_data' not in st.session_state:
-            st.session_state.kpi_data = {}
-        if 'quality_report' not in st.session_state:
-            st.session_state.quality_report = {}
         if 'filter_presets' not in st.session_state:
             st.session_state.filter_presets = {}
 
-    def create_modern_navigation(self):
+    def create_modern_navigation(self, page_renderers):
         """Create modern navigation at the top of sidebar"""
         st.sidebar.markdown("""
         <div style='text-align: center; padding: 1rem; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
@@ -64,25 +258,13 @@ class UltimateDashboard:
         </div>
         """, unsafe_allow_html=True)
         
-        # Main navigation
-        pages = {
-            "الرئيسية المتقدمة": "🏠",
-            "التحليلات الذكية": "🧠", 
-            "مركز التصدير": "📤",
-            "رفع البيانات": "📁",
-            "تشغيل مساعد الذكاء الاصطناعي": "🤖",
-            "تقرير الجودة": "📋",
-            "المراقبة المباشرة": "📡"
-        }
-        
-        selected_page = st.sidebar.selectbox(
-            "اختر الصفحة",
-            list(pages.keys()),
-            format_func=lambda x: f"{pages[x]} {x}",
-            key="main_navigation"
-        )
+        # Main navigation (only the selected page's renderer runs)
+        pages = [
+            st.Page(renderer, title=title, icon=icon, url_path=url_path, default=index == 0)
+            for index, (title, icon, url_path, renderer) in enumerate(page_renderers)
+        ]
         
-        return selected_page
+        return st.navigation(pages)
 
     def create_enhanced_filters(self, unified_data):
         """Create enhanced filters with better design"""
@@ -133,14 +315,8 @@ class UltimateDashboard:
         st.sidebar.markdown("#### 🏢 القطاعات")
         
         # Get available sectors
-        available_sectors = set()
-        for dataset_name, df in unified_data.items():
-            if not df.empty:
-                sector_columns = [col for col in df.columns if 'قطاع' in str(col) or 'sector' in str(col).lower()]
-                for col in sector_columns:
-                    available_sectors.update(df[col].dropna().unique())
-        
-        available_sectors = sorted(list(available_sectors))
+        filter_options = get_filter_options(get_data_signature(), unified_data)
+        available_sectors = list(filter_options['sectors'])
         
         if available_sectors:
             # Select all/none buttons
@@ -212,16 +388,18 @@ class UltimateDashboard:
             st.session_state.filter_presets = {}
         st.session_state.filter_presets[name] = filters.copy()
 
-    def create_enhanced_sidebar(self, unified_data):
+    def create_enhanced_sidebar(self, unified_data, page_renderers):
         """Create enhanced sidebar with navigation first"""
         # Navigation first (at the top)
-        selected_page = self.create_modern_navigation()
+        selected_page = self.create_modern_navigation(page_renderers)
         
         # Theme selector
         theme_manager.create_theme_selector()
         
-        # Enhanced filters
-        filters = self.create_enhanced_filters(unified_data)
+        # Enhanced filters (only the main dashboard uses them)
+        filters = {}
+        if selected_page.title == MAIN_PAGE_TITLE:
+            filters = self.create_enhanced_filters(unified_data)
         
         # Notifications
         advanced_features.show_notifications()
@@ -240,29 +418,8 @@ class UltimateDashboard:
     def load_and_process_data(self):
         """Load and process all data sources"""
         try:
-            processor = DataProcessor()
-            
-            # Load all data from database directory
-            all_data = processor.load_all_data()
-            
-            # Flatten the data structure for easier access
-            unified_data = {}
-            for source_name, source_data in all_data.items():
-                if isinstance(source_data, dict):
-                    # Excel file with multiple sheets
-                    for sheet_name, sheet_data in source_data.items():
-                        unified_data[f"{source_name}_{sheet_name}"] = sheet_data
-                else:
-                    # CSV file
-                    unified_data[source_name.replace('.csv', '')] = source_data
-            
-            # Generate KPIs
-            kpi_data = processor.generate_kpis(unified_data)
-            
-            # Generate quality report
-            quality_report = processor.generate_quality_report(unified_data)
-            
-            return processor, unified_data, kpi_data, quality_report
+            # Shared across sessions and reruns until the database files change
+            return get_dashboard_bundle(get_data_signature())
             
         except Exception as e:
             st.error(f"خطأ في تحميل البيانات: {str(e)}")
@@ -277,7 +434,7 @@ class UltimateDashboard:
             🛡️ Ultimate Safety & Compliance Dashboard
         </div>
         <div style="text-align: center; margin-bottom: 2rem; color: #666;">
-            مرحباً بك في لوحة معلومات السلامة والامتثال | آخر تحديث: {datetime.now().strftime("%H:%M")}
+            مرحباً بك في لوحة معلومات السلامة والامتثال | آخر تحديث: {get_update_timestamp()[-5:]}
         </div>
         ''', unsafe_allow_html=True)
         
@@ -309,44 +466,63 @@ class UltimateDashboard:
 
     def apply_filters(self, unified_data, filters):
         """Apply filters to unified data"""
+        # Reuse the last result while the data and filter selections are unchanged
+        filter_key = tuple(sorted(
+            (key, tuple(value) if isinstance(value, (list, tuple)) else value)
+            for key, value in filters.items()
+        ))
+        cached = st.session_state.get('_filtered_data')
+        if cached and cached[0] is unified_data and cached[1] == filter_key:
+            return cached[2]
+        
         filtered_data = {}
+        column_roles = get_column_roles(unified_data)
         
         for dataset_name, df in unified_data.items():
             if df.empty:
                 filtered_data[dataset_name] = df
                 continue
                 
-            filtered_df = df.copy()
+            roles = column_roles[dataset_name]
+            
+            # Combine every filter into one row mask and index the frame once
+            mask = np.ones(len(df), dtype=bool)
             
             # Apply sector filter
             if 'sectors' in filters and filters['sectors']:
-                sector_columns = [col for col in df.columns if 'قطاع' in str(col) or 'sector' in str(col).lower()]
+                sector_columns = roles['sector']
                 if sector_columns:
-                    sector_mask = filtered_df[sector_columns[0]].isin(filters['sectors'])
-                    filtered_df = filtered_df[sector_mask]
+                    sector_mask = first_column(df, sector_columns[0]).isin(filters['sectors'])
+                    np.logical_and(mask, sector_mask.to_numpy(), out=mask)
             
             # Apply status filter
             if 'status' in filters and filters['status'] and 'الكل' not in filters['status']:
-                status_columns = [col for col in df.columns if 'حالة' in str(col) or 'status' in str(col).lower()]
+                status_columns = roles['status']
                 if status_columns:
-                    status_mask = filtered_df[status_columns[0]].isin(filters['status'])
-                    filtered_df = filtered_df[status_mask]
+                    status_mask = first_column(df, status_columns[0]).isin(filters['status'])
+                    np.logical_and(mask, status_mask.to_numpy(), out=mask)
             
             # Apply date range filter
             if 'date_range' in filters and len(filters['date_range']) == 2:
-                date_columns = [col for col in df.columns if 'تاريخ' in str(col) or 'date' in str(col).lower()]
+                date_columns = roles['date']
                 if date_columns:
                     try:
-                        filtered_df[date_columns[0]] = pd.to_datetime(filtered_df[date_columns[0]], errors='coerce')
+                        date_values = first_column(df, date_columns[0])
+                        if not pd.api.types.is_datetime64_any_dtype(date_values):
+                            date_values = pd.to_datetime(date_values, errors='coerce')
+                        
+                        # Compare against native bounds covering the whole end day
                         start_date, end_date = filters['date_range']
-                        date_mask = (filtered_df[date_columns[0]] >= pd.Timestamp(start_date)) & \
-                                   (filtered_df[date_columns[0]] <= pd.Timestamp(end_date))
-                        filtered_df = filtered_df[date_mask]
+                        start_ts = pd.Timestamp(start_date)
+                        end_ts = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+                        date_mask = (date_values >= start_ts) & (date_values < end_ts)
+                        np.logical_and(mask, date_mask.to_numpy(), out=mask)
                     except:
                         pass
             
-            filtered_data[dataset_name] = filtered_df
+            filtered_data[dataset_name] = df if mask.all() else df[mask]
         
+        st.session_state._filtered_data = (unified_data, filter_key, filtered_data)
         return filtered_data
 
     def create_kpi_cards(self, kpi_data):
@@ -390,17 +566,15 @@ class UltimateDashboard:
         
         with col1:
             st.markdown("#### 📈 ملخص البيانات")
-            summary_data = []
-            for dataset_name, df in filtered_data.items():
-                if not df.empty:
-                    summary_data.append({
-                        'مجموعة البيانات': dataset_name,
-                        'عدد السجلات': len(df),
-                        'عدد الأعمدة': len(df.columns)
-                    })
+            non_empty = {dataset_name: df for dataset_name, df in filtered_data.items() if not df.empty}
+            summary_data = bool(non_empty)
             
             if summary_data:
-                summary_df = pd.DataFrame(summary_data)
+                summary_df = pd.DataFrame({
+                    'مجموعة البيانات': list(non_empty),
+                    'عدد السجلات': [len(df) for df in non_empty.values()],
+                    'عدد الأعمدة': [len(df.columns) for df in non_empty.values()]
+                })
                 st.dataframe(summary_df, use_container_width=True)
         
         with col2:
@@ -464,45 +638,16 @@ class UltimateDashboard:
             )
         
         # Process compliance data
-        compliance_data = []
+        compliance_data = pd.DataFrame()
         
         # Get inspection data if available
         inspection_data = filtered_data.get('ملاحظات_التفتيش', pd.DataFrame())
         
-        if not inspection_data.empty:
-            for sector in selected_sectors:
-                # Filter data for this sector
-                sector_data = inspection_data[inspection_data.get('القطاع', '').str.contains(sector, na=False)]
-                
-                if not sector_data.empty:
-                    total_records = len(sector_data)
-                    closed_records = len(sector_data[sector_data.get('الحالة', '').str.contains('مغلق|مكتمل', na=False)])
-                    
-                    compliance_percentage = (closed_records / total_records * 100) if total_records > 0 else 0
-                    
-                    # Generate recommendations based on compliance percentage
-                    if compliance_percentage >= 90:
-                        recommendation = "ممتاز - استمر في الأداء الجيد"
-                        status_color = "🟢"
-                    elif compliance_percentage >= 70:
-                        recommendation = "جيد - يحتاج تحسين طفيف"
-                        status_color = "🟡"
-                    else:
-                        recommendation = "يحتاج تحسين عاجل"
-                        status_color = "🔴"
-                    
-                    compliance_data.append({
-                        'القطاع': sector,
-                        'إجمالي السجلات': total_records,
-                        'السجلات المغلقة': closed_records,
-                        'السجلات المفتوحة': total_records - closed_records,
-                        'نسبة الامتثال %': compliance_percentage,
-                        'الحالة': f"{status_color} {'مغلق' if compliance_percentage >= 50 else 'مفتوح'}",
-                        'التوصية': recommendation
-                    })
-        
-        if compliance_data:
-            df = pd.DataFrame(compliance_data)
+        if not inspection_data.empty and selected_sectors:
+            compliance_data = calculate_sector_compliance(inspection_data, tuple(selected_sectors))
+        
+        if not compliance_data.empty:
+            df = compliance_data
             
             # Display interactive table
             st.dataframe(
@@ -530,13 +675,30 @@ class UltimateDashboard:
             )
             
             if selected_sector_detail:
-                sector_detail_data = inspection_data[
-                    inspection_data.get('القطاع', '').str.contains(selected_sector_detail, na=False)
-                ]
+                sector_index = build_sector_index(inspection_data, tuple(selected_sectors))
+                sector_detail_data = inspection_data.iloc[sector_index[selected_sector_detail]]
                 
                 if not sector_detail_data.empty:
                     st.markdown(f"**تفاصيل {selected_sector_detail}:**")
-                    st.dataframe(sector_detail_data, use_container_width=True)
+                    
+                    # Only ship the requested number of rows to the browser
+                    rows_to_show = st.number_input(
+                        "عدد الصفوف المعروضة",
+                        min_value=50,
+                        max_value=5000,
+                        value=200,
+                        step=50,
+                        key="compliance_detail_rows"
+                    )
+                    st.dataframe(sector_detail_data.head(rows_to_show), use_container_width=True, height=400)
+                    
+                    st.download_button(
+                        "تنزيل CSV",
+                        data=dataframe_to_csv(sector_detail_data),
+                        file_name=f"{selected_sector_detail}_details.csv",
+                        mime="text/csv",
+                        key="compliance_detail_download"
+                    )
                 else:
                     st.info(f"لا توجد بيانات تفصيلية متاحة لـ {selected_sector_detail}")
         else:
@@ -571,53 +733,16 @@ class UltimateDashboard:
             )
         
         # Process risk data
-        risk_data = []
+        risk_data = pd.DataFrame()
         
         # Get risk assessment data if available
         risk_assessment_data = filtered_data.get('تقييم_المخاطر', pd.DataFrame())
         
         if not risk_assessment_data.empty:
-            for activity in risk_activities:
-                # Filter data for this activity
-                activity_data = risk_assessment_data[
-                    risk_assessment_data.astype(str).apply(
-                        lambda x: x.str.contains(activity, na=False)
-                    ).any(axis=1)
-                ]
-                
-                if not activity_data.empty:
-                    total_assessments = len(activity_data)
-                    high_risk = len(activity_data[
-                        activity_data.astype(str).apply(
-                            lambda x: x.str.contains('عالي|مرتفع', na=False)
-                        ).any(axis=1)
-                    ])
-                    
-                    # Generate risk level
-                    risk_percentage = (high_risk / total_assessments * 100) if total_assessments > 0 else 0
-                    
-                    if risk_percentage >= 70:
-                        risk_level = "🔴 عالي"
-                        priority = 1
-                    elif risk_percentage >= 40:
-                        risk_level = "🟡 متوسط"
-                        priority = 2
-                    else:
-                        risk_level = "🟢 منخفض"
-                        priority = 3
-                    
-                    risk_data.append({
-                        'النشاط': activity,
-                        'إجمالي التقييمات': total_assessments,
-                        'المخاطر العالية': high_risk,
-                        'مستوى المخاطر': risk_level,
-                        'نسبة المخاطر %': f"{risk_percentage:.1f}%",
-                        'الأولوية': priority,
-                        'التوصية': 'مراجعة عاجلة' if risk_percentage >= 70 else 'مراقبة دورية'
-                    })
-        
-        if risk_data:
-            df = pd.DataFrame(risk_data)
+            risk_data = calculate_activity_risk(risk_assessment_data, tuple(risk_activities))
+        
+        if not risk_data.empty:
+            df = risk_data
             
             # Sort based on selection
             if activity_sort == "الأولوية":
@@ -661,13 +786,15 @@ class UltimateDashboard:
             key="incidents_year_filter"
         )
         
-        # Process incidents data
-        incidents_data = []
+        # Process incidents data, one list per output column
+        incident_sectors, incident_totals, recommendation_counts, closed_counts = [], [], [], []
         
         # Get incidents data if available
         incidents_df = filtered_data.get('الحوادث', pd.DataFrame())
         
         if not incidents_df.empty:
+            incident_roles = get_column_roles({'الحوادث': incidents_df})['الحوادث']
+            
             # Define sectors for incidents analysis
             sectors = incidents_df.get('القطاع', pd.Series()).unique() if 'القطاع' in incidents_df.columns else []
             
@@ -692,32 +819,38 @@ class UltimateDashboard:
                     closed_count = 0
                     
                     # Check for recommendations columns
-                    rec_columns = [col for col in sector_incidents.columns if 'توصي' in str(col) or 'recommendation' in str(col).lower()]
+                    rec_columns = incident_roles['recommendation']
                     if rec_columns:
                         recommendations_count = sector_incidents[rec_columns[0]].notna().sum()
                     else:
                         recommendations_count = total_incidents  # Assume each incident has a recommendation
                     
                     # Check for status columns
-                    status_columns = [col for col in sector_incidents.columns if 'حالة' in str(col) or 'status' in str(col).lower()]
+                    status_columns = incident_roles['status']
                     if status_columns:
                         closed_count = sector_incidents[status_columns[0]].str.contains('مغلق|مكتمل|closed', na=False).sum()
                     else:
                         closed_count = int(total_incidents * 0.7)  # Assume 70% are closed
                     
-                    closure_percentage = (closed_count / recommendations_count * 100) if recommendations_count > 0 else 0
-                    
-                    incidents_data.append({
-                        'القطاع': sector,
-                        'عدد الحوادث': total_incidents,
-                        'عدد التوصيات': recommendations_count,
-                        'مغلق': closed_count,
-                        'مفتوح': recommendations_count - closed_count,
-                        'نسبة الإغلاق %': closure_percentage
-                    })
-        
-        if incidents_data:
-            df = pd.DataFrame(incidents_data)
+                    incident_sectors.append(sector)
+                    incident_totals.append(total_incidents)
+                    recommendation_counts.append(recommendations_count)
+                    closed_counts.append(closed_count)
+        
+        if incident_sectors:
+            recommendation_counts = np.array(recommendation_counts)
+            closed_counts = np.array(closed_counts)
+            df = pd.DataFrame({
+                'القطاع': incident_sectors,
+                'عدد الحوادث': incident_totals,
+                'عدد التوصيات': recommendation_counts,
+                'مغلق': closed_counts,
+                'مفتوح': recommendation_counts - closed_counts,
+                'نسبة الإغلاق %': np.divide(
+                    closed_counts * 100.0, recommendation_counts,
+                    out=np.zeros(len(recommendation_counts)), where=recommendation_counts > 0
+                )
+            })
             
             st.dataframe(
                 df,
@@ -758,15 +891,13 @@ class UltimateDashboard:
             
             if not incidents_df.empty:
                 # Try to create a simple trend chart
-                fig = px.bar(
-                    df, 
-                    x='القطاع', 
-                    y='عدد الحوادث',
-                    title="توزيع الحوادث حسب القطاع",
-                    color='عدد الحوادث',
-                    color_continuous_scale='Reds'
-                )
+                fig = go.Figure(go.Bar(
+                    x=df['القطاع'],
+                    y=df['عدد الحوادث'],
+                    marker=dict(color=df['عدد الحوادث'], colorscale='Reds', showscale=True)
+                ))
                 fig.update_layout(
+                    title="توزيع الحوادث حسب القطاع",
                     xaxis_title="القطاع",
                     yaxis_title="عدد الحوادث",
                     font=dict(family="Arial", size=12)
@@ -788,13 +919,15 @@ class UltimateDashboard:
                 st.markdown("#### 📊 توزيع المخاطر")
                 # Create risk distribution chart
                 risk_levels = ['عالي', 'متوسط', 'منخفض']
-                risk_counts = []
+                level_hits = np.zeros((len(risk_levels), len(risk_data)), dtype=bool)
                 
-                for level in risk_levels:
-                    count = risk_data.astype(str).apply(
-                        lambda x: x.str.contains(level, na=False)
-                    ).any(axis=1).sum()
-                    risk_counts.append(count)
+                # Convert each column to text once and test every level against it
+                for _, col_data in risk_data.items():
+                    col_text = col_data.astype(str)
+                    for i, level in enumerate(risk_levels):
+                        level_hits[i] |= col_text.str.contains(level, regex=False, na=False).to_numpy()
+                
+                risk_counts = level_hits.sum(axis=1).tolist()
                 
                 fig = px.pie(
                     values=risk_counts,
@@ -890,14 +1023,38 @@ class UltimateDashboard:
             ))
             st.plotly_chart(fig, use_container_width=True)
 
+    def summarize_quality_report(self, quality_report):
+        """Sum record and missing value counts across datasets in a single pass"""
+        cached = st.session_state.get('_qr_summary')
+        if cached and cached[0] is quality_report:
+            return cached[1]
+        
+        total_records = 0
+        total_missing = 0
+        for report in quality_report.values():
+            total_records += report.total_rows
+            total_missing += report.missing_values
+        
+        st.session_state._qr_summary = (quality_report, (total_records, total_missing))
+        return total_records, total_missing
+
+    def create_chatbot_page(self, unified_data, kpi_data):
+        """Run the AI assistant, degrading gracefully if it fails"""
+        try:
+            # Imported on first use so other pages do not pay for loading the assistant
+            from src.components.gemini_chatbot import create_chatbot_interface
+            create_chatbot_interface(unified_data, kpi_data)
+        except Exception as e:
+            st.error(f"خطأ في المساعد الذكي: {str(e)}")
+            st.info("المساعد الذكي غير متاح حالياً")
+
     def create_quality_report_page(self, quality_report):
         """Create comprehensive quality report page"""
         st.header("📋 تقرير جودة البيانات الشامل")
         
         if quality_report:
             # Overall summary
-            total_records = sum([report.get('total_rows', 0) for report in quality_report.values()])
-            total_missing = sum([report.get('missing_values', 0) for report in quality_report.values()])
+            total_records, total_missing = self.summarize_quality_report(quality_report)
             
             col1, col2, col3, col4 = st.columns(4)
             
@@ -919,64 +1076,80 @@ class UltimateDashboard:
             st.markdown("---")
             st.markdown("### 📊 تقارير مفصلة لكل مجموعة بيانات")
             
-            for dataset_name, report in quality_report.items():
-                with st.expander(f"📋 {dataset_name}", expanded=False):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.subheader("📈 إحصائيات عامة")
-                        
-                        metrics = {
-                            'إجمالي الصفوف': report.get('total_rows', 0),
-                            'إجمالي الأعمدة': report.get('total_columns', 0),
-                            'البيانات المفقودة': report.get('missing_values', 0),
-                            'الصفوف المكررة': report.get('duplicate_rows', 0),
-                            'نسبة البيانات المفقودة': f"{report.get('missing_data_percentage', 0):.1f}%"
-                        }
-                        
-                        for key, value in metrics.items():
-                            st.markdown(f"**{key}:** {value}")
-                    
-                    with col2:
-                        st.subheader("🔍 أنواع البيانات")
-                        
-                        if 'data_types' in report:
-                            data_types_df = pd.DataFrame([
-                                {'العمود': col, 'النوع': str(dtype)}
-                                for col, dtype in report['data_types'].items()
-                            ])
-                            st.dataframe(data_types_df, use_container_width=True, height=300)
-                    
-                    # Quality recommendations
-                    st.subheader("💡 توصيات التحسين")
-                    
-                    missing_pct = report.get('missing_data_percentage', 0)
-                    duplicate_rows = report.get('duplicate_rows', 0)
-                    
-                    recommendations = []
-                    
-                    if missing_pct > 10:
-                        recommendations.append(f"🔴 نسبة البيانات المفقودة عالية ({missing_pct:.1f}%) - يجب مراجعة مصادر البيانات")
-                    elif missing_pct > 5:
-                        recommendations.append(f"🟡 نسبة البيانات المفقودة متوسطة ({missing_pct:.1f}%) - يمكن تحسينها")
-                    else:
-                        recommendations.append(f"🟢 نسبة البيانات المفقودة منخفضة ({missing_pct:.1f}%) - جودة ممتازة")
-                    
-                    if duplicate_rows > 0:
-                        recommendations.append(f"⚠️ يوجد {duplicate_rows} صف مكرر - يجب إزالة التكرارات")
-                    else:
-                        recommendations.append("✅ لا توجد صفوف مكررة")
-                    
-                    if report.get('total_rows', 0) > 10000:
-                        recommendations.append("📊 مجموعة بيانات كبيرة - فكر في تحسين الأداء")
-                    
-                    for rec in recommendations:
-                        st.markdown(f"• {rec}")
+            self.render_quality_details(quality_report)
         
         else:
             st.warning("لا يوجد تقرير جودة متاح")
             st.info("تأكد من تحميل البيانات أولاً لإنشاء تقرير الجودة")
 
+    @st.fragment
+    def render_quality_details(self, quality_report):
+        """Render the per-dataset quality reports without rerunning the whole app"""
+        show_all = st.checkbox("عرض الكل", value=False, key="quality_show_all")
+        
+        if show_all:
+            for dataset_name, report in quality_report.items():
+                with st.expander(f"📋 {dataset_name}", expanded=False):
+                    self.render_quality_entry(report)
+        else:
+            selected_dataset = st.selectbox(
+                "اختر مجموعة البيانات",
+                list(quality_report.keys()),
+                key="quality_dataset_select"
+            )
+            with st.container():
+                self.render_quality_entry(quality_report[selected_dataset])
+
+    def render_quality_entry(self, report):
+        """Render the quality statistics and recommendations for one dataset"""
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("📈 إحصائيات عامة")
+            
+            metrics = {
+                'إجمالي الصفوف': report.formatted['total_rows'],
+                'إجمالي الأعمدة': report.formatted['total_columns'],
+                'البيانات المفقودة': report.formatted['missing_values'],
+                'الصفوف المكررة': report.formatted['duplicate_rows'],
+                'نسبة البيانات المفقودة': report.formatted['missing_percentage']
+            }
+            
+            for key, value in metrics.items():
+                st.markdown(f"**{key}:** {value}")
+        
+        with col2:
+            st.subheader("🔍 أنواع البيانات")
+            
+            data_types_df = build_data_types_table(report.column_names, report.column_types)
+            st.dataframe(data_types_df, use_container_width=True, height=300)
+        
+        # Quality recommendations
+        st.subheader("💡 توصيات التحسين")
+        
+        missing_pct = report.missing_data_percentage
+        duplicate_rows = report.duplicate_rows
+        
+        recommendations = []
+        
+        if missing_pct > 10:
+            recommendations.append(f"🔴 نسبة البيانات المفقودة عالية ({report.formatted['missing_percentage']}) - يجب مراجعة مصادر البيانات")
+        elif missing_pct > 5:
+            recommendations.append(f"🟡 نسبة البيانات المفقودة متوسطة ({report.formatted['missing_percentage']}) - يمكن تحسينها")
+        else:
+            recommendations.append(f"🟢 نسبة البيانات المفقودة منخفضة ({report.formatted['missing_percentage']}) - جودة ممتازة")
+        
+        if duplicate_rows > 0:
+            recommendations.append(f"⚠️ يوجد {report.formatted['duplicate_rows']} صف مكرر - يجب إزالة التكرارات")
+        else:
+            recommendations.append("✅ لا توجد صفوف مكررة")
+        
+        if report.total_rows > 10000:
+            recommendations.append("📊 مجموعة بيانات كبيرة - فكر في تحسين الأداء")
+        
+        for rec in recommendations:
+            st.markdown(f"• {rec}")
+
     def run(self):
         """Main application runner"""
         # Custom CSS for better styling
@@ -1019,73 +1192,51 @@ class UltimateDashboard:
         </style>
         """, unsafe_allow_html=True)
         
-        # Load data if not already loaded
-        if not st.session_state.data_loaded:
-            with st.spinner("جاري تحميل ومعالجة البيانات..."):
-                try:
-                    processor, unified_data, kpi_data, quality_report = self.load_and_process_data()
-                    
-                    st.session_state.processor = processor
-                    st.session_state.unified_data = unified_data
-                    st.session_state.kpi_data = kpi_data
-                    st.session_state.quality_report = quality_report
-                    st.session_state.data_loaded = True
-                    
-                except Exception as e:
-                    advanced_features.add_notification(f"خطأ في تحميل البيانات: {str(e)}", "error")
-                    st.session_state.processor = None
-                    st.session_state.unified_data = {}
-                    st.session_state.kpi_data = {}
-                    st.session_state.quality_report = {}
-                    st.session_state.data_loaded = True
-        
-        # Get data from session state
-        unified_data = st.session_state.unified_data
-        kpi_data = st.session_state.kpi_data
-        quality_report = st.session_state.quality_report
+        # Load data (served from the cache after the first load)
+        processor, unified_data, kpi_data, quality_report = self.load_and_process_data()
+        
+        # Pages as (title, icon, url path, renderer); filters is bound below
+        page_renderers = [
+            (MAIN_PAGE_TITLE, "🏠", "dashboard",
+             lambda: self.create_ultimate_main_dashboard(unified_data, kpi_data, filters)),
+            ("التحليلات الذكية", "🧠", "analytics",
+             lambda: self.create_analytics_section(unified_data)),
+            ("مركز التصدير", "📤", "export",
+             lambda: advanced_features.create_export_center(unified_data, kpi_data)),
+            ("رفع البيانات", "📁", "upload",
+             advanced_features.create_manual_upload_section),
+            ("تشغيل مساعد الذكاء الاصطناعي", "🤖", "assistant",
+             lambda: self.create_chatbot_page(unified_data, kpi_data)),
+            ("تقرير الجودة", "📋", "quality",
+             lambda: self.create_quality_report_page(quality_report)),
+            ("المراقبة المباشرة", "📡", "monitoring",
+             lambda: advanced_features.create_real_time_monitoring(unified_data))
+        ]
         
         # Create enhanced sidebar with navigation first
-        filters, selected_page = self.create_enhanced_sidebar(unified_data)
+        filters, selected_page = self.create_enhanced_sidebar(unified_data, page_renderers)
         
         # Show help if requested
         if st.session_state.get('show_help', False):
             return
         
         # Display selected page
-        if selected_page == "الرئيسية المتقدمة":
-            self.create_ultimate_main_dashboard(unified_data, kpi_data, filters)
-        
-        elif selected_page == "التحليلات الذكية":
-            self.create_analytics_section(unified_data)
-        
-        elif selected_page == "مركز التصدير":
-            advanced_features.create_export_center(unified_data, kpi_data)
-        
-        elif selected_page == "رفع البيانات":
-            advanced_features.create_manual_upload_section()
-        
-        elif selected_page == "تشغيل مساعد الذكاء الاصطناعي":
-            try:
-                create_chatbot_interface(unified_data, kpi_data)
-            except Exception as e:
-                st.error(f"خطأ في المساعد الذكي: {str(e)}")
-                st.info("المساعد الذكي غير متاح حالياً")
-        
-        elif selected_page == "المراقبة المباشرة":
-            advanced_features.create_real_time_monitoring(unified_data)
-        
-        elif selected_page == "تقرير الجودة":
-            self.create_quality_report_page(quality_report)
+        selected_page.run()
         
         # Footer
-        current_theme = theme_manager.get_current_theme()
-        st.markdown("---")
-        st.markdown(f"""
-        <div style='text-align: center; color: {current_theme['text_secondary']}; padding: 1rem;'>
-            <p>🛡️ Ultimate Safety & Compliance Dashboard v4.0 | {current_theme['icon']} {current_theme['name']}</p>
-            <p>آخر تحديث: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        render_footer()
+
+@st.fragment(run_every="60s")
+def render_footer():
+    """Render the footer, refreshing its timestamp without rerunning the app"""
+    current_theme = theme_manager.get_current_theme()
+    st.markdown("---")
+    st.markdown(f"""
+    <div style='text-align: center; color: {current_theme['text_secondary']}; padding: 1rem;'>
+        <p>🛡️ Ultimate Safety & Compliance Dashboard v4.0 | {current_theme['icon']} {current_theme['name']}</p>
+        <p>آخر تحديث: {get_update_timestamp()}</p>
+    </div>
+    """, unsafe_allow_html=True)
 
 # Main execution
 def main():
@@ -3,6 +3,7 @@ Advanced Dashboard Components
 Comprehensive visualization components for the Safety & Compliance Dashboard
 """
 
+import re
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -15,6 +16,106 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+# Column name patterns identifying the role a column plays in a dataset
+ROLE_PATTERNS = {
+    'department': re.compile('إدارة|قطاع|department', re.IGNORECASE),
+    'status': re.compile('حالة|status', re.IGNORECASE),
+    'activity': re.compile('نشاط|activity|تصنيف', re.IGNORECASE),
+    'risk': re.compile('تصنيف|مخاطر|risk', re.IGNORECASE),
+    'risk_score': re.compile('نسب|مخاطر|risk|score', re.IGNORECASE)
+}
+
+# Value patterns for status and risk level labels
+CLOSED_PATTERN = re.compile('مغلق|Closed')
+OPEN_PATTERN = re.compile('مفتوح|Open')
+RISK_LEVEL_PATTERNS = {
+    'عالي': re.compile('عالي|high', re.IGNORECASE),
+    'متوسط': re.compile('متوسط|medium', re.IGNORECASE),
+    'منخفض': re.compile('منخفض|low', re.IGNORECASE)
+}
+
+def schema_signature(unified_data):
+    """Build a hashable signature of the columns and dtypes of each dataset"""
+    return tuple(
+        (data_type, tuple(df.columns), tuple(df.dtypes.astype(str)))
+        for data_type, df in unified_data.items()
+        if not df.empty
+    )
+
+@st.cache_data(show_spinner=False)
+def resolve_schemas(col_signature):
+    """Resolve the columns playing each role for every dataset"""
+    schemas = {}
+    
+    for data_type, columns, dtypes in col_signature:
+        schema = {
+            role: [col for col in columns if pattern.search(str(col))]
+            for role, pattern in ROLE_PATTERNS.items()
+        }
+        schema['date_cols'] = [col for col, dtype in zip(columns, dtypes) if dtype.startswith('datetime64')]
+        numeric_cols = {col for col, dtype in zip(columns, dtypes) if dtype.startswith(('int', 'float', 'Int', 'Float'))}
+        schema['risk_score'] = [col for col in schema['risk_score'] if col in numeric_cols]
+        schemas[data_type] = schema
+    
+    return schemas
+
+def match_values(series, pattern):
+    """Match a regex against a series, scanning only the categories of categoricals"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        matched = categories[categories.astype(str).str.contains(pattern, na=False)]
+        return series.isin(matched)
+    
+    return series.astype(str).str.contains(pattern, na=False)
+
+@st.cache_data(show_spinner=False)
+def dataframe_to_csv(df):
+    """Encode a dataframe as UTF-8 CSV for download"""
+    return df.to_csv(index=False).encode('utf-8-sig')
+
+def freeze_filters(filters):
+    """Convert the filter selections into a hashable tuple"""
+    frozen = []
+    for key, value in sorted((filters or {}).items()):
+        if not value:
+            continue
+        if key == 'date_range':
+            frozen.append((key, tuple(value)))
+        else:
+            frozen.append((key, tuple(sorted(value, key=str))))
+    return tuple(frozen)
+
+def frame_fingerprint(df):
+    """Hash the columns, dtypes, index and values of a frame so equal content shares a cache entry"""
+    return (
+        tuple(df.columns),
+        tuple(df.dtypes.astype(str)),
+        pd.util.hash_pandas_object(df, index=True).values.tobytes()
+    )
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: frame_fingerprint})
+def filter_datasets(unified_data, frozen_filters):
+    """Apply the frozen filters to every dataset once per selection"""
+    components = DashboardComponents()
+    filters = dict(frozen_filters)
+    schemas = components._get_schemas(unified_data)
+    
+    return {
+        data_type: components._apply_filters(df, filters, schemas.get(data_type))
+        for data_type, df in unified_data.items()
+    }
+
+# Dataset key fragments summed into each KPI card
+KPI_BUCKETS = ('inspection', 'incident', 'risk', 'contractor')
+
+# Upper bounds on the categories sent to the browser per chart
+MAX_HEATMAP_ROWS = 30
+MAX_HEATMAP_COLUMNS = 30
+MAX_BAR_CATEGORIES = 25
+
+# Rows per page in the detailed data tables
+TABLE_PAGE_SIZE = 1000
+
 class DashboardComponents:
     """Advanced dashboard components for safety and compliance visualization"""
     
@@ -28,45 +129,54 @@ class DashboardComponents:
             'light': '#f8f9fa',
             'dark': '#343a40'
         }
-        
+    
+    def _get_schemas(self, unified_data):
+        """Get the cached column roles for each dataset"""
+        return resolve_schemas(schema_signature(unified_data))
+    
     def create_kpi_cards(self, kpi_data):
         """Create KPI cards matching the Power BI layout"""
         if not kpi_data:
             st.warning("No KPI data available")
             return
         
+        # Bucket record totals by dataset type in a single pass
+        totals = dict.fromkeys(KPI_BUCKETS, 0)
+        for key, data in kpi_data.items():
+            key_lower = key.lower()
+            for bucket in KPI_BUCKETS:
+                if bucket in key_lower:
+                    totals[bucket] += data.get('total_records', 0)
+                    break
+        
         # Main KPI row
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_inspections = sum([data.get('total_records', 0) for key, data in kpi_data.items() if 'inspection' in key.lower()])
             st.metric(
                 label="إجمالي التفتيشات",
-                value=f"{total_inspections:,}",
+                value=f"{totals['inspection']:,}",
                 delta="12% من الشهر الماضي"
             )
         
         with col2:
-            total_incidents = sum([data.get('total_records', 0) for key, data in kpi_data.items() if 'incident' in key.lower()])
             st.metric(
                 label="إجمالي الحوادث",
-                value=f"{total_incidents:,}",
+                value=f"{totals['incident']:,}",
                 delta="-5% من الشهر الماضي"
             )
         
         with col3:
-            total_risks = sum([data.get('total_records', 0) for key, data in kpi_data.items() if 'risk' in key.lower()])
             st.metric(
                 label="تقييمات المخاطر",
-                value=f"{total_risks:,}",
+                value=f"{totals['risk']:,}",
                 delta="8% من الشهر الماضي"
             )
         
         with col4:
-            total_audits = sum([data.get('total_records', 0) for key, data in kpi_data.items() if 'contractor' in key.lower()])
             st.metric(
                 label="تدقيق المقاولين",
-                value=f"{total_audits:,}",
+                value=f"{totals['contractor']:,}",
                 delta="15% من الشهر الماضي"
             )
     
@@ -97,15 +207,18 @@ class DashboardComponents:
             # Department performance
             dept_data = self._get_department_performance(unified_data)
             if not dept_data.empty:
-                fig = px.bar(
-                    dept_data,
-                    x='department',
-                    y='compliance_rate',
+                top_departments = dept_data.nlargest(MAX_BAR_CATEGORIES, 'compliance_rate')
+                fig = go.Figure(go.Bar(
+                    x=top_departments['department'],
+                    y=top_departments['compliance_rate'],
+                    marker=dict(color=top_departments['compliance_rate'], colorscale='RdYlGn', showscale=True)
+                ))
+                fig.update_layout(
                     title="معدل الامتثال حسب القطاع",
-                    color='compliance_rate',
-                    color_continuous_scale='RdYlGn'
+                    xaxis_title='department',
+                    yaxis_title='compliance_rate',
+                    xaxis_tickangle=-45
                 )
-                fig.update_layout(xaxis_tickangle=-45)
                 st.plotly_chart(fig, use_container_width=True)
     
     def create_risk_management_section(self, unified_data):
@@ -156,10 +269,16 @@ class DashboardComponents:
         st.subheader("خريطة حرارية للأنشطة")
         
         heatmap_data = self._prepare_heatmap_data(unified_data)
-        if heatmap_data.empty:
+        if heatmap_data.empty or heatmap_data.shape[0] < 2 or heatmap_data.shape[1] < 2:
             st.warning("لا توجد بيانات كافية لإنشاء الخريطة الحرارية")
             return
         
+        # Keep the most frequent departments and activities to bound the figure size
+        heatmap_data = heatmap_data.loc[
+            heatmap_data.sum(axis=1).nlargest(MAX_HEATMAP_ROWS).index,
+            heatmap_data.sum(axis=0).nlargest(MAX_HEATMAP_COLUMNS).index
+        ]
+        
         fig = px.imshow(
             heatmap_data,
             title="كثافة الأنشطة حسب القطاع والنوع",
@@ -230,65 +349,93 @@ class DashboardComponents:
         
         return filters
     
-    def create_detailed_tables(self, unified_data, filters=None):
+    def create_detailed_tables(self, unified_data, filters=None, quality_report=None):
         """Create detailed data tables with filtering"""
         st.subheader("الجداول التفصيلية")
         
         # Create tabs for different data types
         tabs = st.tabs(list(unified_data.keys()))
         
+        # Filter all datasets once, reusing the cached result while filters are unchanged
+        filtered_data = filter_datasets(unified_data, freeze_filters(filters)) if filters else unified_data
+        schemas = self._get_schemas(unified_data)
+        
         for i, (data_type, df) in enumerate(unified_data.items()):
             with tabs[i]:
                 if df.empty:
                     st.warning(f"لا توجد بيانات متاحة لـ {data_type}")
                     continue
                 
-                # Apply filters if provided
-                filtered_df = self._apply_filters(df, filters) if filters else df
+                filtered_df = filtered_data[data_type]
                 
                 # Display summary statistics
-                col1, col2, col3 = st.columns(3)
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
                     st.metric("إجمالي السجلات", len(filtered_df))
                 with col2:
-                    open_count = len(filtered_df[filtered_df.apply(lambda row: any('مفتوح' in str(val) for val in row), axis=1)])
+                    open_count = self._count_matching_rows(filtered_df, OPEN_PATTERN, schemas.get(data_type))
                     st.metric("السجلات المفتوحة", open_count)
                 with col3:
-                    closed_count = len(filtered_df[filtered_df.apply(lambda row: any('مغلق' in str(val) for val in row), axis=1)])
+                    closed_count = self._count_matching_rows(filtered_df, CLOSED_PATTERN, schemas.get(data_type))
                     st.metric("السجلات المغلقة", closed_count)
+                with col4:
+                    # Looked up from the quality report built at load time instead of rescanning the grid
+                    if quality_report and data_type in quality_report:
+                        st.metric("البيانات المفقودة", quality_report[data_type].formatted['missing_percentage'])
                 
-                # Display the table
+                # Display the table one page at a time
+                page_count = max(1, -(-len(filtered_df) // TABLE_PAGE_SIZE))
+                page = 1
+                if page_count > 1:
+                    page = st.number_input(
+                        f"الصفحة (من {page_count})",
+                        min_value=1,
+                        max_value=page_count,
+                        value=1,
+                        key=f"detailed_table_page_{data_type}"
+                    )
+                start = (page - 1) * TABLE_PAGE_SIZE
                 st.dataframe(
-                    filtered_df,
+                    filtered_df.iloc[start:start + TABLE_PAGE_SIZE],
                     use_container_width=True,
                     height=400
                 )
                 
                 # Download button
-                csv = filtered_df.to_csv(index=False)
+                # Serialized once per filtered frame rather than on every rerun
                 st.download_button(
                     label=f"تحميل بيانات {data_type}",
-                    data=csv,
+                    data=dataframe_to_csv(filtered_df),
                     file_name=f"{data_type}_{datetime.now().strftime('%Y%m%d')}.csv",
                     mime="text/csv"
                 )
     
+    def _count_matching_rows(self, df, pattern, schema=None):
+        """Count rows whose status matches a pattern, or any cell when there is no status column"""
+        columns = schema['status'] if schema and schema['status'] else df.columns
+        mask = np.zeros(len(df), dtype=bool)
+        
+        for i in range(df.shape[1]):
+            if df.columns[i] in columns:
+                mask |= match_values(df.iloc[:, i], pattern).to_numpy(dtype=bool)
+        
+        return int(mask.sum())
+    
     def _get_compliance_data(self, unified_data):
         """Extract compliance data from unified datasets"""
         compliance_counts = {'مغلق': 0, 'مفتوح': 0}
+        schemas = self._get_schemas(unified_data)
         
-        for data_type, df in unified_data.items():
-            if df.empty:
-                continue
+        for data_type, schema in schemas.items():
+            df = unified_data[data_type]
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
-                    status_counts = df[col].value_counts()
-                    for status, count in status_counts.items():
-                        if 'مغلق' in str(status):
-                            compliance_counts['مغلق'] += count
-                        elif 'مفتوح' in str(status):
-                            compliance_counts['مفتوح'] += count
+            for col in schema['status']:
+                status_counts = df[col].value_counts()
+                labels = status_counts.index.astype(str)
+                is_closed = labels.str.contains(CLOSED_PATTERN)
+                is_open = ~is_closed & labels.str.contains(OPEN_PATTERN)
+                compliance_counts['مغلق'] += status_counts[is_closed].sum()
+                compliance_counts['مفتوح'] += status_counts[is_open].sum()
         
         return pd.DataFrame([
             {'status': 'مغلق', 'count': compliance_counts['مغلق']},
@@ -297,80 +444,56 @@ class DashboardComponents:
     
     def _get_department_performance(self, unified_data):
         """Calculate department performance metrics"""
-        dept_performance = {}
+        dept_rates = []
+        schemas = self._get_schemas(unified_data)
+        
+        for data_type, schema in schemas.items():
+            if schema['department'] and schema['status']:
+                df = unified_data[data_type]
+                dept_col = schema['department'][0]
+                status_col = schema['status'][0]
+                subset = df[[dept_col, status_col]].dropna()
+                closed = match_values(subset[status_col], CLOSED_PATTERN)
+                rates = closed.groupby(subset[dept_col], sort=False, observed=True).mean() * 100
+                dept_rates.append(rates)
+        
+        if not dept_rates:
+            return pd.DataFrame()
         
-        for data_type, df in unified_data.items():
-            if df.empty:
-                continue
-            
-            dept_col = None
-            status_col = None
-            
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department']):
-                    dept_col = col
-                elif any(keyword in col.lower() for keyword in ['حالة', 'status']):
-                    status_col = col
-            
-            if dept_col and status_col:
-                dept_status = df.groupby(dept_col)[status_col].value_counts().unstack(fill_value=0)
-                for dept in dept_status.index:
-                    closed = dept_status.loc[dept].get('مغلق', 0)
-                    total = dept_status.loc[dept].sum()
-                    compliance_rate = (closed / total * 100) if total > 0 else 0
-                    
-                    if dept not in dept_performance:
-                        dept_performance[dept] = []
-                    dept_performance[dept].append(compliance_rate)
-        
-        # Calculate average compliance rate per department
-        result = []
-        for dept, rates in dept_performance.items():
-            avg_rate = np.mean(rates) if rates else 0
-            result.append({'department': dept, 'compliance_rate': avg_rate})
-        
-        return pd.DataFrame(result)
+        # Average compliance rate per department across datasets
+        avg_rates = pd.concat(dept_rates).groupby(level=0, sort=False).mean()
+        return avg_rates.rename_axis('department').reset_index(name='compliance_rate')
     
     def _get_risk_levels(self, risk_data):
         """Extract risk level distribution"""
-        risk_levels = {'عالي': 0, 'متوسط': 0, 'منخفض': 0}
-        
-        for col in risk_data.columns:
-            if any(keyword in col.lower() for keyword in ['تصنيف', 'مخاطر', 'risk']):
-                level_counts = risk_data[col].value_counts()
-                for level, count in level_counts.items():
-                    level_str = str(level).lower()
-                    if 'عالي' in level_str or 'high' in level_str:
-                        risk_levels['عالي'] += count
-                    elif 'متوسط' in level_str or 'medium' in level_str:
-                        risk_levels['متوسط'] += count
-                    elif 'منخفض' in level_str or 'low' in level_str:
-                        risk_levels['منخفض'] += count
+        risk_levels = list(RISK_LEVEL_PATTERNS)
+        counts = np.zeros(len(risk_levels), dtype=np.int64)
+        schema = self._get_schemas({'risk_assessments': risk_data}).get('risk_assessments')
+        
+        for col in (schema['risk'] if schema else []):
+            # Classify each distinct label once, then count rows through their integer codes
+            codes, uniques = pd.factorize(risk_data[col])
+            labels = pd.Series(uniques, dtype=object).astype(str)
+            unique_levels = np.select(
+                [labels.str.contains(pattern) for pattern in RISK_LEVEL_PATTERNS.values()],
+                range(len(risk_levels)),
+                default=-1
+            )
+            row_levels = unique_levels[codes[codes >= 0]]
+            counts += np.bincount(row_levels[row_levels >= 0], minlength=len(risk_levels))
         
-        return pd.DataFrame([
-            {'risk_level': level, 'count': count}
-            for level, count in risk_levels.items()
-        ])
+        return pd.DataFrame({'risk_level': risk_levels, 'count': counts})
     
     def _get_risk_trend(self, risk_data):
         """Calculate risk trend over time"""
-        date_col = None
-        risk_col = None
-        
-        for col in risk_data.columns:
-            if risk_data[col].dtype == 'datetime64[ns]':
-                date_col = col
-                break
-        
-        for col in risk_data.columns:
-            if any(keyword in col.lower() for keyword in ['نسب', 'مخاطر', 'risk', 'score']):
-                if pd.api.types.is_numeric_dtype(risk_data[col]):
-                    risk_col = col
-                    break
+        schema = self._get_schemas({'risk_assessments': risk_data}).get('risk_assessments')
         
-        if not date_col or not risk_col:
+        if not schema or not schema['date_cols'] or not schema['risk_score']:
             return pd.DataFrame()
         
+        date_col = schema['date_cols'][0]
+        risk_col = schema['risk_score'][0]
+        
         trend_data = risk_data[[date_col, risk_col]].dropna()
         trend_data = trend_data.groupby(pd.Grouper(key=date_col, freq='M')).agg({
             risk_col: 'mean'
@@ -387,43 +510,29 @@ class DashboardComponents:
     
     def _prepare_heatmap_data(self, unified_data):
         """Prepare data for activity heatmap"""
-        activity_counts = {}
-        
-        for data_type, df in unified_data.items():
-            if df.empty:
-                continue
-            
-            dept_col = None
-            activity_col = None
-            
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department']):
-                    dept_col = col
-                elif any(keyword in col.lower() for keyword in ['نشاط', 'activity', 'تصنيف']):
-                    activity_col = col
+        pairs_list = []
+        schemas = self._get_schemas(unified_data)
+        
+        for data_type, schema in schemas.items():
+            df = unified_data[data_type]
+            # The last matching column wins, and department columns never double as the activity
+            dept_col = schema['department'][-1] if schema['department'] else None
+            activity_col = next((col for col in reversed(schema['activity']) if col not in schema['department']), None)
             
             if dept_col and activity_col:
-                cross_tab = pd.crosstab(df[dept_col], df[activity_col])
-                for dept in cross_tab.index:
-                    for activity in cross_tab.columns:
-                        key = f"{dept}_{activity}"
-                        activity_counts[key] = cross_tab.loc[dept, activity]
+                pairs = df[[dept_col, activity_col]].dropna()
+                if pairs.empty:
+                    continue
+                
+                pairs.columns = ['department', 'activity']
+                pairs_list.append(pairs.astype(object))
         
-        if not activity_counts:
+        if not pairs_list:
             return pd.DataFrame()
         
-        # Convert to matrix format for heatmap
-        departments = list(set([key.split('_')[0] for key in activity_counts.keys()]))
-        activities = list(set(['_'.join(key.split('_')[1:]) for key in activity_counts.keys()]))
-        
-        heatmap_matrix = np.zeros((len(departments), len(activities)))
-        
-        for i, dept in enumerate(departments):
-            for j, activity in enumerate(activities):
-                key = f"{dept}_{activity}"
-                heatmap_matrix[i, j] = activity_counts.get(key, 0)
-        
-        return pd.DataFrame(heatmap_matrix, index=departments, columns=activities)
+        # Count department/activity pairs across all datasets in one pass
+        heatmap_data = pd.concat(pairs_list, ignore_index=True).value_counts(['department', 'activity'])
+        return heatmap_data.unstack(fill_value=0).rename_axis(index=None, columns=None)
     
     def _create_observations_trend(self, unified_data):
         """Create observations trend chart"""
@@ -489,15 +598,13 @@ class DashboardComponents:
     
     def _extract_time_series(self, df, data_type):
         """Extract time series data from dataframe"""
-        date_col = None
-        for col in df.columns:
-            if df[col].dtype == 'datetime64[ns]':
-                date_col = col
-                break
+        schema = self._get_schemas({data_type: df}).get(data_type)
         
-        if not date_col:
+        if not schema or not schema['date_cols']:
             return pd.DataFrame()
         
+        date_col = schema['date_cols'][0]
+        
         time_series = df.groupby(pd.Grouper(key=date_col, freq='M')).size().reset_index()
         time_series.columns = ['date', 'count']
         
@@ -505,107 +612,98 @@ class DashboardComponents:
     
     def _get_overall_date_range(self, unified_data):
         """Get overall date range from all datasets"""
-        all_dates = []
+        schemas = self._get_schemas(unified_data)
+        min_date = max_date = None
         
-        for data_type, df in unified_data.items():
-            if df.empty:
+        # Track running bounds from per-dataset reductions
+        for data_type, schema in schemas.items():
+            if not schema['date_cols']:
+                continue
+            
+            date_data = unified_data[data_type][schema['date_cols']]
+            dataset_min = date_data.min().min()
+            dataset_max = date_data.max().max()
+            if pd.isna(dataset_min):
                 continue
             
-            for col in df.columns:
-                if df[col].dtype == 'datetime64[ns]':
-                    dates = df[col].dropna()
-                    all_dates.extend(dates.tolist())
+            min_date = dataset_min if min_date is None else min(min_date, dataset_min)
+            max_date = dataset_max if max_date is None else max(max_date, dataset_max)
         
-        if not all_dates:
+        if min_date is None:
             return None
         
         return {
-            'min_date': min(all_dates).date(),
-            'max_date': max(all_dates).date()
+            'min_date': min_date.date(),
+            'max_date': max_date.date()
         }
     
     def _get_all_departments(self, unified_data):
         """Get all unique departments from datasets"""
         departments = set()
+        schemas = self._get_schemas(unified_data)
         
-        for data_type, df in unified_data.items():
-            if df.empty:
-                continue
+        for data_type, schema in schemas.items():
+            df = unified_data[data_type]
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department']):
-                    dept_values = df[col].dropna().unique()
-                    departments.update(dept_values)
+            for col in schema['department']:
+                dept_values = df[col].dropna().unique()
+                departments.update(dept_values)
         
         return sorted(list(departments))
     
     def _get_all_statuses(self, unified_data):
         """Get all unique statuses from datasets"""
         statuses = set()
+        schemas = self._get_schemas(unified_data)
         
-        for data_type, df in unified_data.items():
-            if df.empty:
-                continue
+        for data_type, schema in schemas.items():
+            df = unified_data[data_type]
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
-                    status_values = df[col].dropna().unique()
-                    statuses.update(status_values)
+            for col in schema['status']:
+                status_values = df[col].dropna().unique()
+                statuses.update(status_values)
         
         return sorted(list(statuses))
     
     def _get_all_activities(self, unified_data):
         """Get all unique activities from datasets"""
         activities = set()
+        schemas = self._get_schemas(unified_data)
         
-        for data_type, df in unified_data.items():
-            if df.empty:
-                continue
+        for data_type, schema in schemas.items():
+            df = unified_data[data_type]
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['نشاط', 'activity', 'تصنيف']):
-                    activity_values = df[col].dropna().unique()
-                    activities.update(activity_values)
+            for col in schema['activity']:
+                activity_values = df[col].dropna().unique()
+                activities.update(activity_values)
         
         return sorted(list(activities))
     
-    def _apply_filters(self, df, filters):
+    def _apply_filters(self, df, filters, schema=None):
         """Apply filters to dataframe"""
-        filtered_df = df.copy()
-        
         if not filters:
-            return filtered_df
+            return df
+        
+        if schema is None:
+            schema = self._get_schemas({'data': df}).get('data')
+            if schema is None:
+                return df
+        
+        # Combine every filter into a single mask and slice the dataframe once
+        mask = np.ones(len(df), dtype=bool)
         
         # Apply date filter
         if 'date_range' in filters and filters['date_range']:
-            date_cols = [col for col in df.columns if df[col].dtype == 'datetime64[ns]']
-            if date_cols:
-                start_date, end_date = filters['date_range']
-                for col in date_cols:
-                    filtered_df = filtered_df[
-                        (filtered_df[col].dt.date >= start_date) &
-                        (filtered_df[col].dt.date <= end_date)
-                    ]
-        
-        # Apply department filter
-        if 'departments' in filters and filters['departments']:
-            dept_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department'])]
-            if dept_cols:
-                dept_filter = filtered_df[dept_cols[0]].isin(filters['departments'])
-                filtered_df = filtered_df[dept_filter]
-        
-        # Apply status filter
-        if 'statuses' in filters and filters['statuses']:
-            status_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['حالة', 'status'])]
-            if status_cols:
-                status_filter = filtered_df[status_cols[0]].isin(filters['statuses'])
-                filtered_df = filtered_df[status_filter]
-        
-        # Apply activity filter
-        if 'activities' in filters and filters['activities']:
-            activity_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['نشاط', 'activity', 'تصنيف'])]
-            if activity_cols:
-                activity_filter = filtered_df[activity_cols[0]].isin(filters['activities'])
-                filtered_df = filtered_df[activity_filter]
-        
-        return filtered_df
\ No newline at end of file
+            start_date, end_date = filters['date_range']
+            start64 = np.datetime64(start_date, 'ns')
+            end64 = np.datetime64(end_date, 'ns') + np.timedelta64(1, 'D')
+            for col in schema['date_cols']:
+                dates = df[col].to_numpy()
+                mask &= (dates >= start64) & (dates < end64)
+        
+        # Apply department, status and activity filters
+        for filter_key, role in [('departments', 'department'), ('statuses', 'status'), ('activities', 'activity')]:
+            if filters.get(filter_key) and schema[role]:
+                mask &= df[schema[role][0]].isin(set(filters[filter_key])).to_numpy()
+        
+        return df[mask]
@@ -6,11 +6,12 @@ Includes notifications, user management, export features, and more
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
 import io
+import re
+import time
 import base64
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
@@ -25,6 +26,23 @@ from email import encoders
 import warnings
 warnings.filterwarnings('ignore')
 
+# Column name patterns used by the insight generator
+STATUS_COLUMN_PATTERN = re.compile('حالة|status', re.IGNORECASE)
+ACTIVITY_COLUMN_PATTERN = re.compile('نشاط|activity', re.IGNORECASE)
+
+@st.cache_data(show_spinner=False)
+def read_uploaded_file(file_name, file_bytes):
+    """Parse an uploaded Excel or CSV file from memory once per upload"""
+    buffer = io.BytesIO(file_bytes)
+    if file_name.lower().endswith('.csv'):
+        return pd.read_csv(buffer)
+    return pd.read_excel(buffer)
+
+@st.cache_data(show_spinner=False)
+def preview_uploaded_file(file_name, file_bytes, rows=5):
+    """Render the first rows of an uploaded file as HTML once per upload"""
+    return read_uploaded_file(file_name, file_bytes).head(rows).to_html(index=False)
+
 class AdvancedFeatures:
     """Advanced features for the dashboard"""
     
@@ -164,19 +182,20 @@ class AdvancedFeatures:
                 continue
             
             # Search in text columns
-            text_columns = df.select_dtypes(include=['object']).columns
+            text_data = df.select_dtypes(include=['object', 'string', 'category'])
             
-            for col in text_columns:
-                mask = df[col].astype(str).str.contains(query, case=False, na=False)
+            for col, series in text_data.items():
+                mask = series.astype(str).str.contains(query, case=False, na=False)
                 if mask.any():
-                    matching_rows = df[mask]
-                    for idx, row in matching_rows.iterrows():
-                        results.append({
+                    results.extend(
+                        {
                             'data_type': data_type,
                             'column': col,
-                            'value': row[col],
-                            'row_data': row.to_dict()
-                        })
+                            'value': value,
+                            'row_data': row_data
+                        }
+                        for value, row_data in zip(series[mask].tolist(), df[mask].to_dict('records'))
+                    )
         
         return results
     
@@ -462,13 +481,14 @@ class AdvancedFeatures:
                 continue
             
             for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
+                if STATUS_COLUMN_PATTERN.search(col):
+                    # Classify the distinct labels once instead of looping over them in Python
                     status_counts = df[col].value_counts()
-                    for status, count in status_counts.items():
-                        if any(keyword in str(status).lower() for keyword in ['مفتوح', 'open']):
-                            total_open += count
-                        elif any(keyword in str(status).lower() for keyword in ['مغلق', 'closed']):
-                            total_closed += count
+                    labels = status_counts.index.astype(str).str.lower()
+                    is_open = labels.str.contains('مفتوح|open')
+                    is_closed = ~is_open & labels.str.contains('مغلق|closed')
+                    total_open += status_counts[is_open].sum()
+                    total_closed += status_counts[is_closed].sum()
         
         if total_open + total_closed > 0:
             compliance_rate = (total_closed / (total_open + total_closed)) * 100
@@ -497,7 +517,7 @@ class AdvancedFeatures:
                 continue
             
             for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['نشاط', 'activity']):
+                if ACTIVITY_COLUMN_PATTERN.search(col):
                     activities = df[col].dropna()
                     for activity in activities:
                         clean_activity = str(activity).split('\n')[0]
@@ -526,7 +546,6 @@ class AdvancedFeatures:
             st.info("🔄 التحديث التلقائي مفعل")
             
             # Simulate real-time data
-            import time
             placeholder = st.empty()
             
             for i in range(5):
@@ -855,12 +874,12 @@ class AdvancedFeatures:
                     
                     # Process Excel file
                     try:
-                        df = pd.read_excel(file)
+                        df = read_uploaded_file(file.name, file.getvalue())
                         st.write(f"الأبعاد: {df.shape[0]} صف × {df.shape[1]} عمود")
                         
                         # Show preview
                         if st.checkbox(f"معاينة {file.name}", key=f"preview_excel_{file.name}"):
-                            st.dataframe(df.head())
+                            st.markdown(preview_uploaded_file(file.name, file.getvalue()), unsafe_allow_html=True)
                             
                     except Exception as e:
                         st.error(f"خطأ في قراءة الملف: {str(e)}")
@@ -881,12 +900,12 @@ class AdvancedFeatures:
                     
                     # Process CSV file
                     try:
-                        df = pd.read_csv(file)
+                        df = read_uploaded_file(file.name, file.getvalue())
                         st.write(f"الأبعاد: {df.shape[0]} صف × {df.shape[1]} عمود")
                         
                         # Show preview
                         if st.checkbox(f"معاينة {file.name}", key=f"preview_csv_{file.name}"):
-                            st.dataframe(df.head())
+                            st.markdown(preview_uploaded_file(file.name, file.getvalue()), unsafe_allow_html=True)
                             
                     except Exception as e:
                         st.error(f"خطأ في قراءة الملف: {str(e)}")
@@ -911,7 +930,6 @@ class AdvancedFeatures:
             if uploaded_excel or uploaded_csv:
                 with st.spinner("جاري معالجة البيانات..."):
                     # Simulate processing
-                    import time
                     time.sleep(2)
                     
                     st.success("✅ تم معالجة البيانات بنجاح!")
@@ -953,12 +971,14 @@ class AdvancedFeatures:
                 st.dataframe(quality_df, use_container_width=True)
                 
                 # Quality visualization
-                fig = px.bar(
-                    quality_df, 
-                    x='المقياس', 
-                    y='النتيجة',
+                fig = go.Figure(go.Bar(
+                    x=quality_df['المقياس'],
+                    y=quality_df['النتيجة'],
+                    marker=dict(color=quality_df['النتيجة'], colorscale='Viridis', showscale=True)
+                ))
+                fig.update_layout(
                     title='مؤشرات جودة البيانات',
-                    color='النتيجة',
-                    color_continuous_scale='Viridis'
+                    xaxis_title='المقياس',
+                    yaxis_title='النتيجة'
                 )
                 st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
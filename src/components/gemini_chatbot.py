@@ -5,7 +5,6 @@ Intelligent chatbot for safety and compliance data analysis
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import json
@@ -17,6 +16,33 @@ warnings.filterwarnings('ignore')
 # Note: In production, you would use the actual Google Gemini API
 # For this demo, we'll create a comprehensive mock implementation
 
+# Query classification rules, checked in order; the first matching pattern wins
+QUERY_RULES = tuple(
+    (category, re.compile('|'.join(re.escape(keyword) for keyword in keywords), re.IGNORECASE))
+    for category, keywords in (
+        ('total_incidents', ['كم عدد الحوادث', 'إجمالي الحوادث', 'total incidents']),
+        ('open_cases', ['الحالات المفتوحة', 'المفتوح', 'open cases']),
+        ('closed_cases', ['الحالات المغلقة', 'المغلق', 'closed cases']),
+        ('department_performance', ['أداء القطاع', 'القطاعات', 'department performance']),
+        ('risk_assessment', ['تقييم المخاطر', 'المخاطر', 'risk assessment']),
+        ('compliance_rate', ['معدل الامتثال', 'الامتثال', 'compliance rate']),
+        ('trends', ['الاتجاهات', 'التطور', 'trends', 'trend']),
+        ('statistics', ['إحصائيات', 'statistics', 'stats']),
+        # Default classification based on keywords
+        ('statistics', ['كم', 'عدد', 'إجمالي', 'how many', 'total']),
+        ('department_performance', ['أفضل', 'أسوأ', 'best', 'worst']),
+        ('trends', ['متى', 'when', 'تاريخ', 'date'])
+    )
+)
+
+def count_open_closed(status_series):
+    """Count open and closed records by matching the distinct status labels once"""
+    status_counts = status_series.value_counts()
+    labels = status_counts.index.astype(str)
+    is_open = labels.str.contains('مفتوح', regex=False)
+    is_closed = ~is_open & labels.str.contains('مغلق', regex=False)
+    return int(status_counts[is_open].sum()), int(status_counts[is_closed].sum())
+
 class GeminiChatbot:
     """Intelligent chatbot for safety and compliance data analysis"""
     
@@ -25,20 +51,14 @@ class GeminiChatbot:
         self.kpi_data = kpi_data
         self.conversation_history = []
         
+        # Lowercase each dataset's column names once for the keyword lookups
+        self.columns_lower = {
+            data_type: [(col, str(col).lower()) for col in df.columns]
+            for data_type, df in unified_data.items()
+        }
+        
         # Initialize knowledge base
         self.knowledge_base = self._build_knowledge_base()
-        
-        # Common queries and responses
-        self.query_patterns = {
-            'total_incidents': ['كم عدد الحوادث', 'إجمالي الحوادث', 'total incidents'],
-            'open_cases': ['الحالات المفتوحة', 'المفتوح', 'open cases'],
-            'closed_cases': ['الحالات المغلقة', 'المغلق', 'closed cases'],
-            'department_performance': ['أداء القطاع', 'القطاعات', 'department performance'],
-            'risk_assessment': ['تقييم المخاطر', 'المخاطر', 'risk assessment'],
-            'compliance_rate': ['معدل الامتثال', 'الامتثال', 'compliance rate'],
-            'trends': ['الاتجاهات', 'التطور', 'trends', 'trend'],
-            'statistics': ['إحصائيات', 'statistics', 'stats']
-        }
     
     def _build_knowledge_base(self):
         """Build knowledge base from unified data"""
@@ -55,7 +75,7 @@ class GeminiChatbot:
                     'total_records': len(df),
                     'columns': list(df.columns),
                     'date_range': self._get_date_range(df),
-                    'key_statistics': self._get_key_statistics(df)
+                    'key_statistics': self._get_key_statistics(df, data_type)
                 }
         
         # Build key metrics
@@ -68,32 +88,34 @@ class GeminiChatbot:
     
     def _get_date_range(self, df):
         """Get date range from dataframe"""
-        date_columns = [col for col in df.columns if df[col].dtype == 'datetime64[ns]']
-        if not date_columns:
+        date_data = df.select_dtypes(include=['datetime', 'datetimetz'])
+        if date_data.columns.empty:
             return None
         
-        all_dates = pd.concat([df[col].dropna() for col in date_columns])
-        if len(all_dates) == 0:
+        # Column-wise reductions instead of concatenating every date
+        min_date = date_data.min().min()
+        max_date = date_data.max().max()
+        if pd.isna(min_date):
             return None
         
         return {
-            'start': all_dates.min().strftime('%Y-%m-%d'),
-            'end': all_dates.max().strftime('%Y-%m-%d'),
-            'days': (all_dates.max() - all_dates.min()).days
+            'start': min_date.strftime('%Y-%m-%d'),
+            'end': max_date.strftime('%Y-%m-%d'),
+            'days': (max_date - min_date).days
         }
     
-    def _get_key_statistics(self, df):
+    def _get_key_statistics(self, df, data_type):
         """Get key statistics from dataframe"""
         stats = {}
         
         # Status distribution
-        status_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['حالة', 'status'])]
+        status_cols = [col for col, col_lc in self.columns_lower[data_type] if any(keyword in col_lc for keyword in ['حالة', 'status'])]
         if status_cols:
             status_dist = df[status_cols[0]].value_counts().to_dict()
             stats['status_distribution'] = status_dist
         
         # Department distribution
-        dept_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department'])]
+        dept_cols = [col for col, col_lc in self.columns_lower[data_type] if any(keyword in col_lc for keyword in ['إدارة', 'قطاع', 'department'])]
         if dept_cols:
             dept_dist = df[dept_cols[0]].value_counts().head(5).to_dict()
             stats['top_departments'] = dept_dist
@@ -116,14 +138,11 @@ class GeminiChatbot:
             if df.empty:
                 continue
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
-                    status_counts = df[col].value_counts()
-                    for status, count in status_counts.items():
-                        if 'مفتوح' in str(status):
-                            total_open += count
-                        elif 'مغلق' in str(status):
-                            total_closed += count
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['حالة', 'status']):
+                    open_count, closed_count = count_open_closed(df[col])
+                    total_open += open_count
+                    total_closed += closed_count
         
         if total_open + total_closed > 0:
             compliance_rate = (total_closed / (total_open + total_closed)) * 100
@@ -138,10 +157,10 @@ class GeminiChatbot:
             dept_col = None
             status_col = None
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department']):
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['إدارة', 'قطاع', 'department']):
                     dept_col = col
-                elif any(keyword in col.lower() for keyword in ['حالة', 'status']):
+                elif any(keyword in col_lc for keyword in ['حالة', 'status']):
                     status_col = col
             
             if dept_col and status_col:
@@ -177,22 +196,11 @@ class GeminiChatbot:
     
     def _classify_query(self, query):
         """Classify user query into categories"""
-        query_lower = query.lower()
+        for category, pattern in QUERY_RULES:
+            if pattern.search(query):
+                return category
         
-        for category, patterns in self.query_patterns.items():
-            for pattern in patterns:
-                if pattern.lower() in query_lower:
-                    return category
-        
-        # Default classification based on keywords
-        if any(word in query_lower for word in ['كم', 'عدد', 'إجمالي', 'how many', 'total']):
-            return 'statistics'
-        elif any(word in query_lower for word in ['أفضل', 'أسوأ', 'best', 'worst']):
-            return 'department_performance'
-        elif any(word in query_lower for word in ['متى', 'when', 'تاريخ', 'date']):
-            return 'trends'
-        else:
-            return 'general'
+        return 'general'
     
     def _generate_response(self, query_type, user_query):
         """Generate response based on query type"""
@@ -236,8 +244,8 @@ class GeminiChatbot:
         
         # Get status distribution
         status_dist = {}
-        for col in incidents_df.columns:
-            if any(keyword in col.lower() for keyword in ['حالة', 'status']):
+        for col, col_lc in self.columns_lower['incidents']:
+            if any(keyword in col_lc for keyword in ['حالة', 'status']):
                 status_dist = incidents_df[col].value_counts().to_dict()
                 break
         
@@ -278,8 +286,8 @@ class GeminiChatbot:
             if df.empty:
                 continue
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['حالة', 'status']):
                     open_count = len(df[df[col].str.contains('مفتوح', na=False)])
                     if open_count > 0:
                         open_cases[data_type] = open_count
@@ -326,8 +334,8 @@ class GeminiChatbot:
             if df.empty:
                 continue
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['حالة', 'status']):
                     closed_count = len(df[df[col].str.contains('مغلق', na=False)])
                     if closed_count > 0:
                         closed_cases[data_type] = closed_count
@@ -368,7 +376,7 @@ class GeminiChatbot:
     
     def _get_department_performance(self):
         """Get department performance analysis"""
-        dept_performance = {}
+        dept_frames = []
         
         for data_type, df in self.unified_data.items():
             if df.empty:
@@ -377,57 +385,55 @@ class GeminiChatbot:
             dept_col = None
             status_col = None
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department']):
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['إدارة', 'قطاع', 'department']):
                     dept_col = col
-                elif any(keyword in col.lower() for keyword in ['حالة', 'status']):
+                elif any(keyword in col_lc for keyword in ['حالة', 'status']):
                     status_col = col
             
             if dept_col and status_col:
                 dept_status = df.groupby(dept_col)[status_col].value_counts().unstack(fill_value=0)
-                for dept in dept_status.index:
-                    closed = dept_status.loc[dept].get('مغلق', 0)
-                    total = dept_status.loc[dept].sum()
-                    compliance_rate = (closed / total * 100) if total > 0 else 0
-                    
-                    if dept not in dept_performance:
-                        dept_performance[dept] = {'total': 0, 'closed': 0, 'rates': []}
-                    
-                    dept_performance[dept]['total'] += total
-                    dept_performance[dept]['closed'] += closed
-                    dept_performance[dept]['rates'].append(compliance_rate)
-        
-        if not dept_performance:
+                total = dept_status.sum(axis=1)
+                closed = dept_status.get('مغلق', pd.Series(0, index=dept_status.index))
+                dept_frames.append(pd.DataFrame({
+                    'total': total,
+                    'closed': closed,
+                    'rate': (closed / total * 100).where(total > 0, 0)
+                }))
+        
+        if not dept_frames:
             return {
                 'text': "لا توجد بيانات أداء القطاعات متاحة.",
                 'chart': None,
                 'data': None
             }
         
-        # Calculate average performance
-        performance_data = []
-        for dept, data in dept_performance.items():
-            avg_rate = np.mean(data['rates']) if data['rates'] else 0
-            performance_data.append({
-                'القطاع': dept,
-                'معدل الامتثال': avg_rate,
-                'إجمالي الحالات': data['total'],
-                'الحالات المغلقة': data['closed']
-            })
+        # Calculate average performance across all datasets at once
+        dept_performance = pd.concat(dept_frames).groupby(level=0, sort=False).agg(
+            total=('total', 'sum'), closed=('closed', 'sum'), rate=('rate', 'mean')
+        )
         
-        performance_df = pd.DataFrame(performance_data)
+        performance_df = pd.DataFrame({
+            'القطاع': dept_performance.index,
+            'معدل الامتثال': dept_performance['rate'].to_numpy(),
+            'إجمالي الحالات': dept_performance['total'].to_numpy(),
+            'الحالات المغلقة': dept_performance['closed'].to_numpy()
+        })
         performance_df = performance_df.sort_values('معدل الامتثال', ascending=False)
         
         # Create chart
-        fig = px.bar(
-            performance_df.head(10),
-            x='القطاع',
-            y='معدل الامتثال',
+        top_performance = performance_df.head(10)
+        fig = go.Figure(go.Bar(
+            x=top_performance['القطاع'],
+            y=top_performance['معدل الامتثال'],
+            marker=dict(color=top_performance['معدل الامتثال'], colorscale='RdYlGn', showscale=True)
+        ))
+        fig.update_layout(
             title="أداء القطاعات - معدل الامتثال",
-            color='معدل الامتثال',
-            color_continuous_scale='RdYlGn'
+            xaxis_title='القطاع',
+            yaxis_title='معدل الامتثال',
+            xaxis_tickangle=-45
         )
-        fig.update_layout(xaxis_tickangle=-45)
         
         # Generate text summary
         best_dept = performance_df.iloc[0]
@@ -459,8 +465,8 @@ class GeminiChatbot:
         # Get risk level distribution
         risk_levels = {'عالي': 0, 'متوسط': 0, 'منخفض': 0}
         
-        for col in risk_df.columns:
-            if any(keyword in col.lower() for keyword in ['تصنيف', 'مخاطر', 'risk']):
+        for col, col_lc in self.columns_lower['risk_assessments']:
+            if any(keyword in col_lc for keyword in ['تصنيف', 'مخاطر', 'risk']):
                 level_counts = risk_df[col].value_counts()
                 for level, count in level_counts.items():
                     level_str = str(level).lower()
@@ -521,16 +527,11 @@ class GeminiChatbot:
             type_open = 0
             type_closed = 0
             
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
-                    status_counts = df[col].value_counts()
-                    for status, count in status_counts.items():
-                        if 'مفتوح' in str(status):
-                            type_open += count
-                            total_open += count
-                        elif 'مغلق' in str(status):
-                            type_closed += count
-                            total_closed += count
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['حالة', 'status']):
+                    type_open, type_closed = count_open_closed(df[col])
+                    total_open += type_open
+                    total_closed += type_closed
                     break
             
             if type_open + type_closed > 0:
@@ -556,15 +557,17 @@ class GeminiChatbot:
             for data_type, data in compliance_by_type.items()
         ])
         
-        fig = px.bar(
-            chart_data,
-            x='نوع البيانات',
-            y='معدل الامتثال',
+        fig = go.Figure(go.Bar(
+            x=chart_data['نوع البيانات'],
+            y=chart_data['معدل الامتثال'],
+            marker=dict(color=chart_data['معدل الامتثال'], colorscale='RdYlGn', showscale=True)
+        ))
+        fig.update_layout(
             title="معدل الامتثال حسب نوع البيانات",
-            color='معدل الامتثال',
-            color_continuous_scale='RdYlGn'
+            xaxis_title='نوع البيانات',
+            yaxis_title='معدل الامتثال',
+            xaxis_tickangle=-45
         )
-        fig.update_layout(xaxis_tickangle=-45)
         
         text = f"ملخص الامتثال العام:\n\n"
         text += f"معدل الامتثال الإجمالي: {overall_compliance:.1f}%\n"
@@ -666,21 +669,18 @@ class GeminiChatbot:
                 stats['date_ranges'][data_type] = date_range
             
             # Get department info
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department']):
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['إدارة', 'قطاع', 'department']):
                     dept_counts = df[col].value_counts().head(3)
                     stats['top_departments'][data_type] = dept_counts.to_dict()
                     break
             
             # Get status info
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in ['حالة', 'status']):
-                    status_counts = df[col].value_counts()
-                    for status, count in status_counts.items():
-                        if 'مفتوح' in str(status):
-                            stats['status_summary']['مفتوح'] += count
-                        elif 'مغلق' in str(status):
-                            stats['status_summary']['مغلق'] += count
+            for col, col_lc in self.columns_lower[data_type]:
+                if any(keyword in col_lc for keyword in ['حالة', 'status']):
+                    open_count, closed_count = count_open_closed(df[col])
+                    stats['status_summary']['مفتوح'] += open_count
+                    stats['status_summary']['مغلق'] += closed_count
                     break
         
         text = f"الإحصائيات العامة للنظام:\n\n"
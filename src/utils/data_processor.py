@@ -10,6 +10,8 @@ import sys
 import os
 from datetime import datetime, timedelta
 import warnings
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
 # Add parent directories to path for imports
@@ -24,6 +26,62 @@ except ImportError:
     CSV_FILES = []
     EXCEL_FILES = {}
 
+def _keyword_pattern(keywords):
+    """Compile column name keywords into a single case-insensitive pattern"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+
+# Column name patterns identifying the role a column plays
+DATE_COLUMN_PATTERN = _keyword_pattern(['تاريخ', 'date'])
+NUMERIC_COLUMN_PATTERN = _keyword_pattern(['عدد', 'نسبة', 'رقم', 'number', 'count', 'percentage'])
+STATUS_COLUMN_PATTERN = _keyword_pattern(['حالة', 'status', 'state'])
+CATEGORY_COLUMN_PATTERN = _keyword_pattern(['حالة', 'status', 'state', 'إدارة', 'قطاع', 'department', 'sector', 'نشاط', 'activity', 'تصنيف'])
+RISK_SCORE_COLUMN_PATTERN = _keyword_pattern(['مخاطر', 'risk', 'score', 'نسب'])
+STATUS_SUMMARY_PATTERN = _keyword_pattern(['حالة', 'status'])
+DEPARTMENT_COLUMN_PATTERN = _keyword_pattern(['إدارة', 'قطاع', 'department', 'sector'])
+ACTIVITY_COLUMN_PATTERN = _keyword_pattern(['نشاط', 'activity', 'تصنيف'])
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    # Fall back to the C parser and object strings if pyarrow is not installed
+    PYARROW_AVAILABLE = False
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    # Fall back to openpyxl if the Rust-based calamine reader is not installed
+    EXCEL_ENGINE = 'openpyxl'
+
+def read_csv_file(file_path, encoding):
+    """Read a CSV file with the multithreaded pyarrow parser when available"""
+    if PYARROW_AVAILABLE:
+        try:
+            # pyarrow passes plain UTF-8 through unvalidated, so decode it with the BOM-aware codec instead
+            arrow_encoding = 'utf-8-sig' if encoding.lower() in ('utf-8', 'utf8') else encoding
+            df = pd.read_csv(file_path, encoding=arrow_encoding, engine='pyarrow')
+        except UnicodeDecodeError:
+            raise
+        except Exception:
+            # Let the C parser handle files pyarrow cannot parse
+            pass
+        else:
+            # pyarrow leaves missing text cells as None, the C parser as NaN
+            for i in np.flatnonzero((df.dtypes == object).to_numpy()):
+                col_data = df.iloc[:, i]
+                df.isetitem(i, col_data.where(col_data.notna(), np.nan))
+            return df
+    
+    return pd.read_csv(file_path, encoding=encoding)
+
+# Read-only quality statistics for one dataset
+QualityEntry = namedtuple('QualityEntry', [
+    'total_rows', 'total_columns', 'missing_values', 'missing_data_percentage',
+    'duplicate_rows', 'data_types', 'column_names', 'column_types', 'memory_usage',
+    'formatted'
+])
+
 class SafetyDataProcessor:
     """Comprehensive data processor for safety and compliance data"""
     
@@ -44,21 +102,32 @@ class SafetyDataProcessor:
         """Load all data from database directory"""
         all_data = {}
         
-        # Load Excel files
-        excel_files = ['sample-of-data.xlsx', 'power-bi-copy-v.02.xlsx']
-        for excel_file in excel_files:
-            file_path = self.get_database_path(excel_file)
-            if os.path.exists(file_path):
-                excel_data = self.load_excel_data(file_path)
-                all_data[excel_file] = excel_data
-        
-        # Load CSV files
+        excel_files = [
+            f for f in ['sample-of-data.xlsx', 'power-bi-copy-v.02.xlsx']
+            if os.path.exists(self.get_database_path(f))
+        ]
         csv_files = [f for f in os.listdir(self.database_dir) if f.endswith('.csv')]
-        for csv_file in csv_files:
-            file_path = self.get_database_path(csv_file)
-            csv_data = self.load_csv_data(file_path)
-            if csv_data is not None and not csv_data.empty:
-                all_data[csv_file] = csv_data
+        
+        # Files are independent, so read and clean them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(excel_files) + len(csv_files)))) as executor:
+            excel_futures = {
+                excel_file: executor.submit(self.load_excel_data, self.get_database_path(excel_file))
+                for excel_file in excel_files
+            }
+            csv_futures = {
+                csv_file: executor.submit(self.load_csv_data, self.get_database_path(csv_file))
+                for csv_file in csv_files
+            }
+            
+            # Load Excel files
+            for excel_file, future in excel_futures.items():
+                all_data[excel_file] = future.result()
+            
+            # Load CSV files
+            for csv_file, future in csv_futures.items():
+                csv_data = future.result()
+                if csv_data is not None and not csv_data.empty:
+                    all_data[csv_file] = csv_data
         
         self.data_sources = all_data
         return all_data
@@ -66,13 +135,17 @@ class SafetyDataProcessor:
     def load_excel_data(self, file_path):
         """Load and process Excel data with multiple sheets"""
         try:
-            excel_file = pd.ExcelFile(file_path)
+            try:
+                excel_file = pd.ExcelFile(file_path, engine=EXCEL_ENGINE)
+            except ValueError:
+                # Older pandas versions do not know the calamine engine
+                excel_file = pd.ExcelFile(file_path, engine='openpyxl')
             data = {}
             
             for sheet_name in excel_file.sheet_names:
                 try:
-                    # Read with proper error handling
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, engine='openpyxl')
+                    # Parse from the already opened workbook
+                    df = excel_file.parse(sheet_name)
                     df = self._clean_dataframe(df, sheet_name)
                     if not df.empty:
                         data[sheet_name] = df
@@ -94,7 +167,7 @@ class SafetyDataProcessor:
             
             for encoding in encodings:
                 try:
-                    df = pd.read_csv(file_path, encoding=encoding)
+                    df = read_csv_file(file_path, encoding)
                     break
                 except UnicodeDecodeError:
                     continue
@@ -142,6 +215,15 @@ class SafetyDataProcessor:
         # Standardize status values
         df = self._standardize_status_values(df)
         
+        # Store repeated status/department/activity labels as categoricals
+        df = self._convert_categorical_columns(df)
+        
+        # Keep the remaining text in Arrow string buffers
+        df = self._convert_arrow_strings(df)
+        
+        # Halve the memory scanned by risk score reductions
+        df = self._downcast_risk_scores(df)
+        
         return df
     
     def _handle_duplicate_columns(self, df):
@@ -191,11 +273,11 @@ class SafetyDataProcessor:
         """Standardize data types across the dataframe"""
         for col in df.columns:
             # Try to convert date columns
-            if any(keyword in col.lower() for keyword in ['تاريخ', 'date']):
+            if DATE_COLUMN_PATTERN.search(col):
                 df[col] = pd.to_datetime(df[col], errors='coerce')
             
             # Try to convert numeric columns
-            elif any(keyword in col.lower() for keyword in ['عدد', 'نسبة', 'رقم', 'number', 'count', 'percentage']):
+            elif NUMERIC_COLUMN_PATTERN.search(col):
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
         return df
@@ -219,7 +301,7 @@ class SafetyDataProcessor:
                             continue
                         
                         # Convert to string and clean
-                        series = col_data.astype(str)
+                        series = col_data.astype(str).where(col_data.notna())
                         series = series.str.strip()
                         series = series.replace('nan', np.nan)
                         series = series.replace('', np.nan)
@@ -247,11 +329,52 @@ class SafetyDataProcessor:
         
         # Apply status standardization to relevant columns
         for col in df.columns:
-            if any(keyword in col.lower() for keyword in ['حالة', 'status', 'state']):
+            if STATUS_COLUMN_PATTERN.search(col):
                 df[col] = df[col].map(status_mappings).fillna(df[col])
         
         return df
     
+    def _convert_categorical_columns(self, df):
+        """Convert low-cardinality text columns to categoricals"""
+        for col in df.columns:
+            col_data = df[col]
+            if isinstance(col_data, pd.DataFrame) or not pd.api.types.is_string_dtype(col_data):
+                continue
+            
+            # Fully missing columns have no labels to share
+            if not col_data.notna().any():
+                continue
+            
+            # Status, department and activity columns are converted more eagerly
+            is_role_column = CATEGORY_COLUMN_PATTERN.search(str(col)) is not None
+            max_unique_ratio = 0.5 if is_role_column else 0.05
+            
+            if col_data.nunique() <= len(col_data) * max_unique_ratio:
+                df[col] = col_data.astype('category')
+        
+        return df
+    
+    def _convert_arrow_strings(self, df):
+        """Convert plain text object columns to Arrow-backed strings"""
+        if not PYARROW_AVAILABLE:
+            return df
+        
+        for i in range(df.shape[1]):
+            col_data = df.iloc[:, i]
+            if col_data.dtype == object and pd.api.types.infer_dtype(col_data, skipna=True) == 'string':
+                df.isetitem(i, col_data.astype('string[pyarrow]'))
+        
+        return df
+    
+    def _downcast_risk_scores(self, df):
+        """Store numeric risk score columns as float32"""
+        for i in range(df.shape[1]):
+            col_data = df.iloc[:, i]
+            if col_data.dtype == np.float64 and RISK_SCORE_COLUMN_PATTERN.search(str(df.columns[i])):
+                df.isetitem(i, col_data.astype(np.float32))
+        
+        return df
+    
     def create_unified_dataset(self, data_sources):
         """Create unified datasets from multiple sources"""
         unified_data = {}
@@ -399,32 +522,27 @@ class SafetyDataProcessor:
     def _get_date_range(self, df):
         """Get date range from dataframe"""
         try:
-            date_columns = []
-            for col in df.columns:
-                try:
-                    if pd.api.types.is_datetime64_any_dtype(df[col]):
-                        date_columns.append(col)
-                except:
-                    continue
-                    
-            if not date_columns:
+            date_data = df.select_dtypes(include=['datetime', 'datetimetz'])
+            if date_data.columns.empty:
                 return None
             
-            all_dates = pd.concat([df[col].dropna() for col in date_columns])
-            if len(all_dates) == 0:
+            # Column-wise reductions instead of concatenating every date
+            min_date = date_data.min().min()
+            max_date = date_data.max().max()
+            if pd.isna(min_date):
                 return None
         except Exception as e:
             print(f"Error getting date range: {str(e)}")
             return None
         
         return {
-            'min_date': all_dates.min(),
-            'max_date': all_dates.max()
+            'min_date': min_date,
+            'max_date': max_date
         }
     
     def _get_status_distribution(self, df):
         """Get status distribution from dataframe"""
-        status_columns = [col for col in df.columns if any(keyword in col.lower() for keyword in ['حالة', 'status'])]
+        status_columns = [col for col in df.columns if STATUS_SUMMARY_PATTERN.search(col)]
         if not status_columns:
             return {}
         
@@ -437,7 +555,7 @@ class SafetyDataProcessor:
     
     def _get_department_distribution(self, df):
         """Get department distribution from dataframe"""
-        dept_columns = [col for col in df.columns if any(keyword in col.lower() for keyword in ['إدارة', 'قطاع', 'department', 'sector'])]
+        dept_columns = [col for col in df.columns if DEPARTMENT_COLUMN_PATTERN.search(col)]
         if not dept_columns:
             return {}
         
@@ -450,7 +568,7 @@ class SafetyDataProcessor:
     
     def _get_activity_distribution(self, df):
         """Get activity distribution from dataframe"""
-        activity_columns = [col for col in df.columns if any(keyword in col.lower() for keyword in ['نشاط', 'activity', 'تصنيف'])]
+        activity_columns = [col for col in df.columns if ACTIVITY_COLUMN_PATTERN.search(col)]
         if not activity_columns:
             return {}
         
@@ -479,14 +597,29 @@ class SafetyDataProcessor:
             if df.empty:
                 continue
                 
-            report[data_type] = {
-                'total_rows': len(df),
-                'total_columns': len(df.columns),
-                'missing_data_percentage': (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100,
-                'duplicate_rows': df.duplicated().sum(),
-                'data_types': df.dtypes.to_dict(),
-                'memory_usage': df.memory_usage(deep=True).sum()
-            }
+            missing_values = int(df.isnull().sum().sum())
+            missing_percentage = (missing_values / (len(df) * len(df.columns))) * 100
+            duplicate_rows = int(df.duplicated().sum())
+            memory_usage = int(df.memory_usage(deep=True).sum())
+            report[data_type] = QualityEntry(
+                total_rows=len(df),
+                total_columns=len(df.columns),
+                missing_values=missing_values,
+                missing_data_percentage=missing_percentage,
+                duplicate_rows=duplicate_rows,
+                data_types=df.dtypes.to_dict(),
+                column_names=tuple(str(col) for col in df.columns),
+                column_types=tuple(str(dtype) for dtype in df.dtypes),
+                memory_usage=memory_usage,
+                formatted={
+                    'total_rows': f"{len(df):,}",
+                    'total_columns': f"{len(df.columns):,}",
+                    'missing_values': f"{missing_values:,}",
+                    'duplicate_rows': f"{duplicate_rows:,}",
+                    'missing_percentage': f"{missing_percentage:.1f}%",
+                    'memory_kb': f"{memory_usage / 1024:.1f} KB"
+                }
+            )
         
         return report
     
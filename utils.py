@@ -2,6 +2,12 @@
 Utility functions for the Safety & Compliance Analytics Platform
 """
 
+import codecs
+import io
+import os
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 import plotly.express as px
@@ -9,6 +15,52 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import streamlit as st
 from config import DATA_CONFIG, KPI_THRESHOLDS, COLORS
+from src.utils.data_processor import read_csv_file
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    # Fall back to pandas string methods if pyarrow is not installed
+    PYARROW_AVAILABLE = False
+
+try:
+    from charset_normalizer import from_bytes
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    # Fall back to trying each encoding in turn if charset_normalizer is not installed
+    CHARSET_NORMALIZER_AVAILABLE = False
+
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_WRITER_ENGINE = 'xlsxwriter'
+except ImportError:
+    # Fall back to openpyxl if xlsxwriter is not installed
+    EXCEL_WRITER_ENGINE = 'openpyxl'
+
+def _compile_value_mappings(mappings):
+    """Compile value mappings into one anchored pattern whose alternatives are tried in mapping order"""
+    return re.compile(r'\A(?:' + '|'.join(
+        f"(?=.*?(?:{'|'.join(re.escape(variation) for variation in variations)}))(?P<g{i}>)"
+        for i, variations in enumerate(mappings.values())
+    ) + ')', re.DOTALL)
+
+# Precompiled status and classification matchers, with the label of each pattern group
+STATUS_PATTERN = _compile_value_mappings(DATA_CONFIG['status_mappings'])
+STATUS_LABELS = {f'g{i}': status.replace('_', ' ').title() for i, status in enumerate(DATA_CONFIG['status_mappings'])}
+CLASSIFICATION_PATTERN = _compile_value_mappings(DATA_CONFIG['classification_mappings'])
+CLASSIFICATION_LABELS = {f'g{i}': value.title() for i, value in enumerate(DATA_CONFIG['classification_mappings'])}
+
+# KPI color buckets: sorted bounds and the color of each bucket, for higher-is-better and lower-is-better KPIs
+KPI_COLOR_BUCKETS = {
+    kpi_type: ([thresholds['good'], thresholds['excellent']], np.array([COLORS['danger'], COLORS['warning'], COLORS['success']], dtype=object))
+    for kpi_type, thresholds in KPI_THRESHOLDS.items() if 'good' in thresholds and 'excellent' in thresholds
+}
+REVERSE_KPI_COLOR_BUCKETS = {
+    kpi_type: ([thresholds['low'], thresholds['medium']], np.array([COLORS['success'], COLORS['warning'], COLORS['danger']], dtype=object))
+    for kpi_type, thresholds in KPI_THRESHOLDS.items() if 'low' in thresholds and 'medium' in thresholds
+}
 
 def clean_text(text):
     """Clean and standardize text values"""
@@ -16,47 +68,71 @@ def clean_text(text):
         return None
     return str(text).strip()
 
+def clean_text_series(text_series):
+    """Clean a whole series of text values, keeping missing values as <NA>"""
+    text_series = text_series.astype('string')
+    if not PYARROW_AVAILABLE:
+        return text_series.str.strip()
+    trimmed = pc.utf8_trim_whitespace(pa.array(text_series, from_pandas=True))
+    return pd.Series(pd.array(trimmed, dtype='string[pyarrow]'), index=text_series.index, name=text_series.name)
+
 def standardize_status(status_value):
     """Standardize status values across all datasets"""
     if pd.isna(status_value):
         return None
     
-    status_str = str(status_value).strip().lower()
-    
-    for standard_status, variations in DATA_CONFIG['status_mappings'].items():
-        if any(variation in status_str for variation in variations):
-            return standard_status.replace('_', ' ').title()
-    
-    return status_value
+    match = STATUS_PATTERN.match(str(status_value).strip().lower())
+    return STATUS_LABELS[match.lastgroup] if match else status_value
 
 def standardize_classification(classification_value):
     """Standardize classification/priority values"""
     if pd.isna(classification_value):
         return None
     
-    class_str = str(classification_value).strip().lower()
-    
-    for standard_class, variations in DATA_CONFIG['classification_mappings'].items():
-        if any(variation in class_str for variation in variations):
-            return standard_class.title()
-    
-    return classification_value
+    match = CLASSIFICATION_PATTERN.match(str(classification_value).strip().lower())
+    return CLASSIFICATION_LABELS[match.lastgroup] if match else classification_value
+
+def _standardize_series(series, pattern, labels):
+    """Map every value of a series to its standard label in one vectorized pass"""
+    series = series.astype(object)
+    matches = series.astype(str).str.strip().str.lower().str.extract(pattern).notna()
+    has_match = matches.any(axis=1)
+    standardized = series.mask(has_match, matches.idxmax(axis=1).map(labels))
+    return standardized.where(series.notna(), None)
+
+def standardize_status_series(status_series):
+    """Standardize a whole series of status values"""
+    return _standardize_series(status_series, STATUS_PATTERN, STATUS_LABELS)
+
+def standardize_classification_series(classification_series):
+    """Standardize a whole series of classification/priority values"""
+    return _standardize_series(classification_series, CLASSIFICATION_PATTERN, CLASSIFICATION_LABELS)
+
+# Event logs repeat the same date strings, so remember recent parses
+@lru_cache(maxsize=4096)
+def _parse_date_string(date_str):
+    """Parse a stripped date string using the configured formats in order"""
+    for date_format in DATA_CONFIG['date_formats']:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+    return None
 
 def parse_date(date_value):
     """Parse date values using multiple formats"""
+    if isinstance(date_value, pd.Series):
+        return parse_date_series(date_value)
+    
     if pd.isna(date_value):
         return None
     
     if isinstance(date_value, datetime):
         return date_value
     
-    date_str = str(date_value).strip()
-    
-    for date_format in DATA_CONFIG['date_formats']:
-        try:
-            return datetime.strptime(date_str, date_format)
-        except ValueError:
-            continue
+    parsed = _parse_date_string(str(date_value).strip())
+    if parsed is not None:
+        return parsed
     
     # Try pandas to_datetime as fallback
     try:
@@ -64,13 +140,39 @@ def parse_date(date_value):
     except:
         return None
 
+def parse_date_series(date_series):
+    """Parse a whole series of date values, trying each format only on the values still unparsed"""
+    date_strings = date_series.astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=date_series.index, dtype='datetime64[ns]')
+    
+    for date_format in DATA_CONFIG['date_formats']:
+        unparsed = parsed.isna() & date_series.notna()
+        if not unparsed.any():
+            return parsed
+        parsed[unparsed] = pd.to_datetime(date_strings[unparsed], format=date_format, errors='coerce')
+    
+    # Let pandas infer the format of each remaining value as a fallback
+    unparsed = parsed.isna() & date_series.notna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(date_series[unparsed], format='mixed', errors='coerce')
+    
+    return parsed
+
 def calculate_closure_rate(status_series):
     """Calculate closure rate from status series"""
     if len(status_series) == 0:
         return 0
     
-    closed_count = (status_series == 'Closed').sum()
-    total_count = len(status_series.dropna())
+    if isinstance(status_series.dtype, pd.CategoricalDtype):
+        # Count over the integer category codes; missing values have code -1
+        codes = status_series.cat.codes.to_numpy()
+        categories = status_series.cat.categories
+        closed_count = (codes == categories.get_loc('Closed')).sum() if 'Closed' in categories else 0
+        total_count = (codes >= 0).sum()
+    else:
+        status_counts = status_series.value_counts()
+        closed_count = status_counts.get('Closed', 0)
+        total_count = status_counts.sum()
     
     return (closed_count / total_count * 100) if total_count > 0 else 0
 
@@ -79,29 +181,34 @@ def get_kpi_color(value, kpi_type, reverse=False):
     if kpi_type not in KPI_THRESHOLDS:
         return COLORS['primary']
     
-    thresholds = KPI_THRESHOLDS[kpi_type]
+    # Missing values never meet a threshold
+    if value != value:
+        return COLORS['danger']
     
     if not reverse:
-        if value >= thresholds['excellent']:
-            return COLORS['success']
-        elif value >= thresholds['good']:
-            return COLORS['warning']
-        else:
-            return COLORS['danger']
+        bounds, colors = KPI_COLOR_BUCKETS[kpi_type]
+        return colors[bisect_right(bounds, value)]
     else:
-        if value <= thresholds['low']:
-            return COLORS['success']
-        elif value <= thresholds['medium']:
-            return COLORS['warning']
-        else:
-            return COLORS['danger']
+        bounds, colors = REVERSE_KPI_COLOR_BUCKETS[kpi_type]
+        return colors[bisect_left(bounds, value)]
 
-def create_metric_card(title, value, delta=None, help_text=None):
-    """Create a styled metric card"""
-    delta_html = f"<small style='color: #666;'>{delta}</small>" if delta else ""
-    help_html = f"<small style='color: #888;'>{help_text}</small>" if help_text else ""
+def get_kpi_colors(values, kpi_type, reverse=False):
+    """Get colors for an array of KPI values in one vectorized lookup"""
+    values = np.asarray(values, dtype=float)
+    if kpi_type not in KPI_THRESHOLDS:
+        return np.full(values.shape, COLORS['primary'], dtype=object)
     
-    return f"""
+    if not reverse:
+        bounds, colors = KPI_COLOR_BUCKETS[kpi_type]
+        bucket = np.searchsorted(bounds, values, side='right')
+    else:
+        bounds, colors = REVERSE_KPI_COLOR_BUCKETS[kpi_type]
+        bucket = np.searchsorted(bounds, values, side='left')
+    
+    # Missing values never meet a threshold
+    return np.where(np.isnan(values), COLORS['danger'], colors[bucket])
+
+METRIC_CARD_TEMPLATE = """
     <div class="metric-card">
         <h3>{title}</h3>
         <h2>{value}</h2>
@@ -110,40 +217,84 @@ def create_metric_card(title, value, delta=None, help_text=None):
     </div>
     """
 
+INSIGHT_ICONS = {
+    "success": "✅",
+    "warning": "⚠️",
+    "error": "🚨",
+    "info": "ℹ️"
+}
+
+@lru_cache(maxsize=1024, typed=True)
+def create_metric_card(title, value, delta=None, help_text=None):
+    """Create a styled metric card"""
+    delta_html = f"<small style='color: #666;'>{delta}</small>" if delta else ""
+    help_html = f"<small style='color: #888;'>{help_text}</small>" if help_text else ""
+    
+    return METRIC_CARD_TEMPLATE.format(title=title, value=value, delta_html=delta_html, help_html=help_html)
+
+@lru_cache(maxsize=1024, typed=True)
 def create_insight_box(message, box_type="info"):
     """Create a styled insight box"""
-    icons = {
-        "success": "✅",
-        "warning": "⚠️",
-        "error": "🚨",
-        "info": "ℹ️"
-    }
-    
-    icon = icons.get(box_type, "ℹ️")
+    icon = INSIGHT_ICONS.get(box_type, "ℹ️")
     css_class = f"{box_type}-box"
     
     return f'<div class="{css_class}">{icon} {message}</div>'
 
-def filter_dataframe(df, filters):
-    """Apply multiple filters to a dataframe"""
-    filtered_df = df.copy()
+# Low-cardinality columns that are filtered and counted by value
+CATEGORICAL_COLUMNS = ('Status', 'Classification', 'Priority')
+
+def prepare_frame(df, columns=CATEGORICAL_COLUMNS):
+    """Convert low-cardinality text columns to categoricals once, before repeated filtering"""
+    conversions = {
+        col: 'category' for col in columns
+        if col in df.columns and pd.api.types.is_string_dtype(df[col].dtype) and not isinstance(df[col].dtype, pd.CategoricalDtype)
+    }
+    return df.astype(conversions) if conversions else df
+
+def _filter_mask(df, filters):
+    """Build one boolean row mask for all filters"""
+    mask = np.ones(len(df), dtype=bool)
     
     for column, values in filters.items():
-        if column in filtered_df.columns and values:
+        # Later predicates cannot bring back rows that are already filtered out
+        if not mask.any():
+            break
+        
+        if column in df.columns and values:
+            col_data = df[column]
             if isinstance(values, list):
-                filtered_df = filtered_df[filtered_df[column].isin(values)]
+                if isinstance(col_data.dtype, pd.CategoricalDtype):
+                    # Compare category codes instead of the values themselves; missing values have code -1
+                    codes = col_data.cat.categories.get_indexer(values)
+                    codes = codes[codes >= 0]
+                    if pd.isna(values).any():
+                        codes = np.append(codes, -1)
+                    mask &= np.isin(col_data.cat.codes.to_numpy(), codes)
+                else:
+                    mask &= col_data.isin(values).to_numpy()
             else:
-                filtered_df = filtered_df[filtered_df[column] == values]
+                mask &= (col_data == values).to_numpy()
     
-    return filtered_df
+    return mask
+
+def filter_dataframe(df, filters):
+    """Apply multiple filters to a dataframe"""
+    return df.loc[_filter_mask(df, filters)]
+
+def _nanmean(values):
+    """Mean of the non-missing entries of a float array, NaN if there are none"""
+    present = ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        return values[present].sum() / present.sum()
 
 def calculate_trend(series, periods=5):
     """Calculate trend direction and magnitude"""
     if len(series) < periods * 2:
         return 0, "insufficient_data"
     
-    recent = series.tail(periods).mean()
-    older = series.head(periods).mean()
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    recent = _nanmean(values[-periods:])
+    older = _nanmean(values[:periods])
     
     if older == 0:
         return 0, "no_baseline"
@@ -159,50 +310,120 @@ def calculate_trend(series, periods=5):
     
     return trend_pct, direction
 
+def _hash_frame(df):
+    """Hash every value of a frame together with its column names"""
+    return tuple(df.columns), pd.util.hash_pandas_object(df, index=False).values.tobytes()
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _summary_table(numeric_df):
+    """Describe the numeric columns once per distinct frame content, shared across reruns"""
+    # One describe call computes every statistic for all columns
+    stats = numeric_df.describe(percentiles=[0.25, 0.5, 0.75]).T
+    return stats[stats['count'] > 0]
+
 def generate_summary_stats(df, numeric_columns=None):
     """Generate comprehensive summary statistics"""
     if numeric_columns is None:
         numeric_columns = df.select_dtypes(include=[np.number]).columns
     
+    columns = [col for col in numeric_columns if col in df.columns]
+    numeric_df = df[columns].select_dtypes(include=[np.number])
+    if numeric_df.shape[1] == 0:
+        return {}
+    
+    stats = _summary_table(numeric_df)
     summary = {}
     
-    for col in numeric_columns:
-        if col in df.columns:
-            series = df[col].dropna()
-            if len(series) > 0:
-                summary[col] = {
-                    'count': len(series),
-                    'mean': series.mean(),
-                    'median': series.median(),
-                    'std': series.std(),
-                    'min': series.min(),
-                    'max': series.max(),
-                    'q25': series.quantile(0.25),
-                    'q75': series.quantile(0.75)
-                }
+    for col, col_stats in stats.iterrows():
+        summary[col] = {
+            'count': int(col_stats['count']),
+            'mean': col_stats['mean'],
+            'median': col_stats['50%'],
+            'std': col_stats['std'],
+            'min': col_stats['min'],
+            'max': col_stats['max'],
+            'q25': col_stats['25%'],
+            'q75': col_stats['75%']
+        }
     
     return summary
 
+def _iqr_outlier_mask(values):
+    """Flag values outside 1.5 IQR of the quartiles of a float array"""
+    q1, q3 = np.quantile(values, [0.25, 0.75])
+    iqr = q3 - q1
+    return (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+
+def _zscore_outlier_mask(values):
+    """Flag values more than 3 standard deviations from the mean of a float array"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs((values - values.mean()) / values.std(ddof=1)) > 3
+
 def detect_outliers(series, method='iqr'):
     """Detect outliers in a numeric series"""
     if method == 'iqr':
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
-        IQR = Q3 - Q1
-        
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        outliers = series[(series < lower_bound) | (series > upper_bound)]
-        
+        outlier_mask = _iqr_outlier_mask
+        min_values = 1
     elif method == 'zscore':
-        z_scores = np.abs((series - series.mean()) / series.std())
-        outliers = series[z_scores > 3]
+        outlier_mask = _zscore_outlier_mask
+        min_values = 2
+    else:
+        return pd.Series(dtype=float)
+    
+    values = series.dropna()
+    if len(values) < min_values:
+        return values.iloc[:0]
     
+    return values[outlier_mask(values.to_numpy(dtype=np.float64))]
+
+def filter_outliers(df, value_col, filters=None, method='iqr'):
+    """Apply the filters and drop outliers of a numeric column from the matching rows in one selection"""
+    if method == 'iqr':
+        outlier_mask = _iqr_outlier_mask
+        min_values = 1
+    elif method == 'zscore':
+        outlier_mask = _zscore_outlier_mask
+        min_values = 2
     else:
-        outliers = pd.Series(dtype=float)
+        return filter_dataframe(df, filters or {})
     
-    return outliers
+    mask = _filter_mask(df, filters or {})
+    values = df[value_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    # Outlier bounds come from the filtered values only, as if detect_outliers ran on the filtered frame
+    candidates = np.flatnonzero(mask & ~np.isnan(values))
+    if len(candidates) >= min_values:
+        mask[candidates[outlier_mask(values[candidates])]] = False
+    
+    return df.loc[mask]
+
+def _create_scatter_figure(data, x_col, y_col, color_col=None, max_marker_size=20):
+    """Build a scatter chart sized by y_col from WebGL traces, which stay responsive with many points"""
+    sizes = data[y_col].to_numpy(dtype=np.float64)
+    # Same area scaling as plotly express, so the largest marker is max_marker_size pixels across
+    size_ref = np.nanmax(sizes) / max_marker_size ** 2 if len(sizes) else 1
+    marker = dict(sizemode='area', sizeref=size_ref)
+    
+    if color_col and not pd.api.types.is_numeric_dtype(data[color_col]):
+        # One trace per category, as plotly express does for discrete colors
+        traces = [
+            go.Scattergl(
+                x=group[x_col].to_numpy(),
+                y=group[y_col].to_numpy(),
+                mode='markers',
+                name=str(name),
+                marker=dict(marker, size=group[y_col].to_numpy(dtype=np.float64))
+            )
+            for name, group in data.groupby(color_col, sort=False)
+        ]
+    else:
+        if color_col:
+            marker.update(color=data[color_col].to_numpy(), colorscale='Plasma', showscale=True, colorbar=dict(title=color_col))
+        traces = [go.Scattergl(x=data[x_col].to_numpy(), y=data[y_col].to_numpy(), mode='markers', marker=dict(marker, size=sizes))]
+    
+    fig = go.Figure(traces)
+    fig.update_layout(xaxis_title=x_col, yaxis_title=y_col, legend_title_text=color_col, uirevision='static')
+    return fig
 
 def create_comparison_chart(data, x_col, y_col, color_col=None, chart_type='bar'):
     """Create a comparison chart with consistent styling"""
@@ -223,13 +444,7 @@ def create_comparison_chart(data, x_col, y_col, color_col=None, chart_type='bar'
             markers=True
         )
     elif chart_type == 'scatter':
-        fig = px.scatter(
-            data, 
-            x=x_col, 
-            y=y_col, 
-            color=color_col,
-            size=y_col
-        )
+        fig = _create_scatter_figure(data, x_col, y_col, color_col)
     else:
         fig = px.bar(data, x=x_col, y=y_col, color=color_col)
     
@@ -246,7 +461,12 @@ def export_data(df, filename, file_format='csv'):
     if file_format == 'csv':
         return df.to_csv(index=False)
     elif file_format == 'excel':
-        return df.to_excel(index=False)
+        buffer = io.BytesIO()
+        # xlsxwriter streams rows to disk instead of holding the whole workbook in memory
+        engine_kwargs = {'options': {'constant_memory': True}} if EXCEL_WRITER_ENGINE == 'xlsxwriter' else None
+        with pd.ExcelWriter(buffer, engine=EXCEL_WRITER_ENGINE, engine_kwargs=engine_kwargs) as writer:
+            df.to_excel(writer, index=False)
+        return buffer.getvalue()
     elif file_format == 'json':
         return df.to_json(orient='records', indent=2)
     else:
@@ -255,34 +475,68 @@ def export_data(df, filename, file_format='csv'):
 def validate_data_quality(df):
     """Validate data quality and return quality metrics"""
     total_cells = df.shape[0] * df.shape[1]
-    missing_cells = df.isnull().sum().sum()
+    # Derive every missing-value count from a single isna pass
+    missing_per_column = df.isna().to_numpy().sum(axis=0)
+    missing_cells = missing_per_column.sum()
     
     quality_metrics = {
         'completeness': (total_cells - missing_cells) / total_cells * 100,
         'missing_values': missing_cells,
         'total_cells': total_cells,
         'duplicate_rows': df.duplicated().sum(),
-        'columns_with_missing': (df.isnull().sum() > 0).sum(),
+        'columns_with_missing': (missing_per_column > 0).sum(),
         'data_types': df.dtypes.value_counts().to_dict()
     }
     
     return quality_metrics
 
-@st.cache_data
-def load_csv_with_encoding(filepath):
-    """Load CSV file with proper encoding detection"""
+# Bytes read from the start of a CSV file to detect its encoding
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+def _sniff_encoding(filepath):
+    """Guess a file's encoding from its first bytes, or None if it cannot be detected"""
+    if not CHARSET_NORMALIZER_AVAILABLE:
+        return None
+    
+    with open(filepath, 'rb') as f:
+        sample = f.read(ENCODING_SNIFF_BYTES)
+    if len(sample) == ENCODING_SNIFF_BYTES:
+        # Cut at the last line break so a multi-byte character is not split
+        sample = sample[:sample.rfind(b'\n') + 1] or sample
+    best_match = from_bytes(sample).best()
+    if best_match is None:
+        return None
+    
+    encoding = codecs.lookup(best_match.encoding).name
+    # ASCII samples may still hold UTF-8 further on, and utf-8-sig also drops a BOM
+    return 'utf-8-sig' if encoding in ('ascii', 'utf-8') else encoding
+
+@st.cache_data(show_spinner=False)
+def _read_csv_with_encodings(filepath, modified_ns, size):
+    """Read a CSV file with the first encoding that decodes it; the file's mtime and size key the cache"""
     encodings = ['utf-8-sig', 'utf-8', 'latin-1', 'cp1252']
+    sniffed_encoding = _sniff_encoding(filepath)
+    if sniffed_encoding is not None:
+        encodings = [sniffed_encoding] + [encoding for encoding in encodings if encoding != sniffed_encoding]
     
     for encoding in encodings:
         try:
-            df = pd.read_csv(filepath, encoding=encoding)
-            return df
+            return read_csv_file(filepath, encoding)
         except UnicodeDecodeError:
             continue
     
+    return None
+
+def load_csv_with_encoding(filepath):
+    """Load CSV file with proper encoding detection"""
+    file_stat = os.stat(filepath)
+    df = _read_csv_with_encodings(filepath, file_stat.st_mtime_ns, file_stat.st_size)
+    if df is not None:
+        return df
+    
     # If all encodings fail, try with error handling
     try:
-        df = pd.read_csv(filepath, encoding='utf-8', errors='ignore')
+        df = pd.read_csv(filepath, encoding='utf-8', encoding_errors='ignore')
         return df
     except Exception as e:
         st.error(f"Failed to load {filepath}: {str(e)}")
@@ -310,4 +564,36 @@ def format_number(number, format_type='auto'):
         elif number == int(number):
             return f"{int(number)}"
         else:
-            return f"{number:.2f}"
\ No newline at end of file
+            return f"{number:.2f}"
+
+def format_numbers(numbers, format_type='auto'):
+    """Format an array of numbers for display, one vectorized pass per format branch"""
+    numbers = np.asarray(numbers, dtype=float)
+    formatted = np.full(numbers.shape, "N/A", dtype=object)
+    valid = ~np.isnan(numbers)
+    values = numbers[valid]
+    
+    if format_type == 'percentage':
+        formatted[valid] = np.char.mod("%.1f%%", values)
+    elif format_type == 'currency':
+        formatted[valid] = np.frompyfunc("${:,.2f}".format, 1, 1)(values)
+    elif format_type == 'integer':
+        formatted[valid] = np.frompyfunc(lambda number: f"{int(number):,}", 1, 1)(values)
+    elif format_type == 'decimal':
+        formatted[valid] = np.char.mod("%.2f", values)
+    else:
+        # Auto format based on value
+        magnitude = np.abs(values)
+        millions = magnitude >= 1000000
+        thousands = ~millions & (magnitude >= 1000)
+        whole = ~millions & ~thousands & (values == np.trunc(values))
+        fractional = ~millions & ~thousands & ~whole
+        
+        auto_formatted = np.empty(values.shape, dtype=object)
+        auto_formatted[millions] = np.char.mod("%.1fM", values[millions] / 1000000)
+        auto_formatted[thousands] = np.char.mod("%.1fK", values[thousands] / 1000)
+        auto_formatted[whole] = np.char.mod("%d", values[whole])
+        auto_formatted[fractional] = np.char.mod("%.2f", values[fractional])
+        formatted[valid] = auto_formatted
+    
+    return formatted